@@ -1,15 +1,32 @@
 """FastAPI web application for WLED control."""
 
 import logging
+import threading
 from typing import Dict, List, Optional
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 import os
 from dotenv import load_dotenv
 
+from .mqtt_bridge import MQTTBridge, PahoTransport
+from .scenes import SceneStore, apply_scene
+from .static_assets import (
+    REVALIDATE_CACHE_CONTROL,
+    Asset,
+    StaticAssetCache,
+    asset_response,
+)
+from .sync import synchronized_apply
+from .timeline import TimelineReader, TimelineRecorder, replay
+from .tracing import (
+    SamplingProfiler,
+    ServerTimingMiddleware,
+    TracedRoute,
+    tracer,
+)
 from .wled_client import WLEDClient
 
 # Load environment variables
@@ -21,16 +38,98 @@ logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(title='WLED Controller', version='1.0.0')
+app.router.route_class = TracedRoute
+
+# Opt-in request tracing (Server-Timing header) and admin endpoints
+tracer.enabled = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+admin_enabled = os.getenv('ADMIN_ENABLED', 'false').lower() == 'true'
+app.add_middleware(ServerTimingMiddleware)
+profiler = SamplingProfiler()
 
 # Initialize WLED client
 wled_host = os.getenv('WLED_HOST', 'http://wled.local')
 wled_client = WLEDClient(host=wled_host)
 
-# Mount static files
-app.mount('/static', StaticFiles(directory='static'), name='static')
 
-# Setup templates
+def load_devices() -> Dict[str, WLEDClient]:
+    """
+    Build the device registry from the environment.
+
+    WLED_DEVICES is a comma-separated list of name=host pairs; the
+    WLED_HOST device is always available as 'default'.
+
+    Returns:
+        WLED clients by device name
+    """
+    registry = {'default': wled_client}
+    for entry in os.getenv('WLED_DEVICES', '').split(','):
+        name, _, host = entry.strip().partition('=')
+        if name and host:
+            registry[name.strip()] = WLEDClient(host=host.strip())
+        elif entry.strip():
+            logger.warning(f'Ignoring malformed WLED_DEVICES entry: {entry}')
+    return registry
+
+
+devices = load_devices()
+
+
+def load_groups() -> Dict[str, List[str]]:
+    """
+    Build MQTT device groups from the environment.
+
+    MQTT_GROUPS is a semicolon-separated list of name=device,device
+    entries.
+
+    Returns:
+        Device names by group name
+    """
+    groups = {}
+    for entry in os.getenv('MQTT_GROUPS', '').split(';'):
+        name, _, members = entry.strip().partition('=')
+        if name and members:
+            groups[name.strip()] = [member.strip()
+                                    for member in members.split(',')
+                                    if member.strip()]
+        elif entry.strip():
+            logger.warning(f'Ignoring malformed MQTT_GROUPS entry: {entry}')
+    return groups
+
+
+# Initialize scene store
+scene_store = SceneStore(os.getenv('SCENE_DB', 'scenes.db'))
+
+# Record every observed state change if a timeline log is configured
+timeline_path = os.getenv('TIMELINE_PATH')
+timeline_recorder = TimelineRecorder(timeline_path) if timeline_path else None
+if timeline_recorder is not None:
+    for device_client in devices.values():
+        device_client.add_listener(timeline_recorder.record)
+active_replays: List[threading.Event] = []
+
+# MQTT bridge, started on application startup if MQTT_HOST is set
+mqtt_bridge: Optional[MQTTBridge] = None
+
+
+def stop_replays() -> None:
+    """Signal all running timeline replays to stop."""
+    for stop in active_replays:
+        stop.set()
+    active_replays.clear()
+
+
+# Load, hash and precompress static files once at startup
+static_assets = StaticAssetCache('static')
+static_assets.load()
+
+# Setup templates and pre-render the index page with hashed asset URLs
 templates = Jinja2Templates(directory='templates')
+templates.env.globals['asset_url'] = static_assets.url_for
+index_page = Asset.from_bytes(
+    'index.html',
+    templates.get_template('index.html').render().encode('utf-8'),
+    media_type='text/html'
+)
 
 # Pydantic models for request validation
 class BrightnessRequest(BaseModel):
@@ -51,11 +150,89 @@ class SpeedRequest(BaseModel):
 class IntensityRequest(BaseModel):
     intensity: int
 
+class SceneCaptureRequest(BaseModel):
+    name: str
+    device: str = 'default'
+
+class SceneApplyRequest(BaseModel):
+    devices: Optional[List[str]] = None
+
+class ReplayRequest(BaseModel):
+    speed: float = 1.0
+    start: Optional[float] = None
+    end: Optional[float] = None
+    targets: Optional[Dict[str, List[str]]] = None
+
+class TracingRequest(BaseModel):
+    enabled: bool
+
+class ProfileRequest(BaseModel):
+    duration: float = 10.0
+
+class SyncEffectRequest(BaseModel):
+    effect_id: int
+    devices: Optional[List[str]] = None
+    target_skew_ms: float = 10.0
+
+
+@app.on_event('startup')
+async def start_mqtt_bridge() -> None:
+    """Start the MQTT bridge if a broker is configured."""
+    global mqtt_bridge
+    mqtt_host = os.getenv('MQTT_HOST')
+    if not mqtt_host:
+        return
+    transport = PahoTransport(
+        mqtt_host,
+        int(os.getenv('MQTT_PORT', '1883')),
+        os.getenv('MQTT_USERNAME'),
+        os.getenv('MQTT_PASSWORD')
+    )
+    mqtt_bridge = MQTTBridge(
+        transport,
+        devices,
+        load_groups(),
+        prefix=os.getenv('MQTT_PREFIX', 'wled'),
+        window=int(os.getenv('MQTT_WINDOW_MS', '50')) / 1000
+    )
+    await mqtt_bridge.start()
+    logger.info(f'MQTT bridge started for broker {mqtt_host}')
+
+
+@app.on_event('shutdown')
+async def stop_mqtt_bridge() -> None:
+    """Flush pending MQTT commands and disconnect."""
+    if mqtt_bridge is not None:
+        await mqtt_bridge.stop()
+
+
+def resolve_devices(names: Optional[List[str]]) -> Dict[str, WLEDClient]:
+    """Look up devices by name (all devices if names is None)."""
+    if names is None:
+        return devices
+    unknown = [name for name in names if name not in devices]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Unknown devices: {", ".join(unknown)}'
+        )
+    return {name: devices[name] for name in names}
+
 
 @app.get('/', response_class=HTMLResponse)
 async def index(request: Request):
-    """Serve the main web UI."""
-    return templates.TemplateResponse('index.html', {'request': request})
+    """Serve the pre-rendered main web UI."""
+    return asset_response(index_page, request, REVALIDATE_CACHE_CONTROL)
+
+
+@app.api_route('/static/{path:path}', methods=['GET', 'HEAD'])
+async def static_file(path: str, request: Request) -> Response:
+    """Serve a precompressed static asset."""
+    with tracer.span('cache'):
+        response = static_assets.response(path, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail='Not Found')
+    return response
 
 
 @app.get('/api/state')
@@ -129,13 +306,14 @@ async def set_brightness(request: BrightnessRequest):
 @app.post('/api/color')
 async def set_color(request: ColorRequest):
     """Set WLED color."""
-    for color, name in [(request.red, 'red'), (request.green, 'green'), 
-                        (request.blue, 'blue'), (request.white, 'white')]:
-        if not 0 <= color <= 255:
-            raise HTTPException(
-                status_code=400, 
-                detail=f'{name.capitalize()} must be 0-255'
-            )
+    with tracer.span('validate'):
+        for color, name in [(request.red, 'red'), (request.green, 'green'), 
+                            (request.blue, 'blue'), (request.white, 'white')]:
+            if not 0 <= color <= 255:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f'{name.capitalize()} must be 0-255'
+                )
     
     success = wled_client.set_color(request.red, request.green, request.blue, request.white)
     if not success:
@@ -179,6 +357,180 @@ async def set_effect_intensity(request: IntensityRequest):
     return {'success': True}
 
 
+@app.get('/api/devices')
+async def list_devices():
+    """List configured WLED devices."""
+    return {
+        'devices': [{'name': name, 'host': client.host}
+                    for name, client in devices.items()]
+    }
+
+
+@app.get('/api/scenes')
+async def list_scenes():
+    """List stored scenes."""
+    return {'scenes': scene_store.names()}
+
+
+@app.post('/api/scenes')
+async def capture_scene(request: SceneCaptureRequest):
+    """Capture the current state of a device as a scene."""
+    client = resolve_devices([request.device])[request.device]
+    state = client.get_state()
+    if state is None:
+        raise HTTPException(status_code=503, detail='WLED device not reachable')
+    return {'name': request.name, 'state': scene_store.save(request.name, state)}
+
+
+@app.get('/api/scenes/{name}')
+async def get_scene(name: str):
+    """Get a stored scene."""
+    state = scene_store.get(name)
+    if state is None:
+        raise HTTPException(status_code=404, detail='Scene not found')
+    return {'name': name, 'state': state}
+
+
+@app.delete('/api/scenes/{name}')
+async def delete_scene(name: str):
+    """Delete a stored scene."""
+    if not scene_store.delete(name):
+        raise HTTPException(status_code=404, detail='Scene not found')
+    return {'success': True}
+
+
+@app.post('/api/scenes/{name}/apply')
+async def apply_scene_to_devices(name: str, request: SceneApplyRequest):
+    """Apply a stored scene to several devices at once."""
+    state = scene_store.get(name)
+    if state is None:
+        raise HTTPException(status_code=404, detail='Scene not found')
+
+    result = await run_in_threadpool(
+        apply_scene, name, state, resolve_devices(request.devices)
+    )
+    if not result.success:
+        raise HTTPException(status_code=503, detail=result.to_dict())
+    return result.to_dict()
+
+
+@app.post('/api/sync/effect')
+async def sync_effect(request: SyncEffectRequest):
+    """Start an effect on several devices at the same moment."""
+    if not 0 <= request.effect_id <= 101:
+        raise HTTPException(status_code=400, detail='Effect ID must be 0-101')
+
+    result = await run_in_threadpool(
+        synchronized_apply,
+        resolve_devices(request.devices),
+        lambda client: client.set_effect(request.effect_id),
+        target_skew_ms=request.target_skew_ms
+    )
+    if not result.success:
+        raise HTTPException(status_code=503, detail=result.to_dict())
+    return result.to_dict()
+
+
+def open_timeline() -> TimelineReader:
+    """Open the configured timeline log for reading."""
+    if timeline_path is None:
+        raise HTTPException(status_code=404,
+                            detail='Timeline recording disabled')
+    return TimelineReader(timeline_path)
+
+
+@app.get('/api/timeline')
+async def get_timeline():
+    """Get the time range covered by the recorded timeline."""
+    reader = open_timeline()
+    try:
+        span = reader.span()
+        checkpoints = reader.checkpoints
+    finally:
+        reader.close()
+    return {
+        'start': span[0] if span else None,
+        'end': span[1] if span else None,
+        'checkpoints': checkpoints,
+    }
+
+
+@app.post('/api/timeline/replay')
+async def replay_timeline(request: ReplayRequest):
+    """Replay the recorded timeline in the background."""
+    if request.speed <= 0:
+        raise HTTPException(status_code=400, detail='Speed must be positive')
+
+    if request.targets is None:
+        targets = {client.host: [client] for client in devices.values()}
+    else:
+        targets = {
+            host: list(resolve_devices(names).values())
+            for host, names in request.targets.items()
+        }
+
+    reader = open_timeline()
+    stop_replays()
+    stop = threading.Event()
+    active_replays.append(stop)
+
+    def run() -> None:
+        try:
+            result = replay(reader, targets, request.speed,
+                            request.start, request.end, stop)
+            logger.info(f'Timeline replay finished: {result}')
+        finally:
+            reader.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return {'success': True}
+
+
+@app.post('/api/timeline/replay/stop')
+async def stop_timeline_replay():
+    """Stop a running timeline replay."""
+    stop_replays()
+    return {'success': True}
+
+
+def require_admin() -> None:
+    """Reject admin requests unless ADMIN_ENABLED is set."""
+    if not admin_enabled:
+        raise HTTPException(status_code=404, detail='Not Found')
+
+
+@app.post('/api/admin/tracing')
+async def set_tracing(request: TracingRequest):
+    """Turn per-request Server-Timing tracing on or off."""
+    require_admin()
+    tracer.enabled = request.enabled
+    return {'enabled': tracer.enabled}
+
+
+@app.post('/api/admin/profile', response_class=PlainTextResponse)
+async def profile(request: ProfileRequest):
+    """Sample all threads for a time window and return collapsed stacks."""
+    require_admin()
+    if not 0 < request.duration <= 60:
+        raise HTTPException(status_code=400, detail='Duration must be 0-60 s')
+    if profiler.running:
+        raise HTTPException(status_code=409, detail='Profile already running')
+
+    try:
+        stacks = await run_in_threadpool(profiler.run, request.duration)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
+
+
+@app.get('/api/mqtt/stats')
+async def get_mqtt_stats():
+    """Get MQTT bridge throughput and latency."""
+    if mqtt_bridge is None:
+        raise HTTPException(status_code=404, detail='MQTT bridge disabled')
+    return mqtt_bridge.stats.to_dict()
+
+
 @app.get('/api/health')
 async def health_check():
     """Health check endpoint."""
@@ -0,0 +1,445 @@
+"""MQTT bridge merging bursts of light commands into single WLED writes."""
+
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+import paho.mqtt.client as mqtt
+
+from .state_diff import is_literal, merge_patch
+from .wled_client import WLEDClient
+
+LATENCY_SAMPLES = 1000
+
+logger = logging.getLogger(__name__)
+
+Message = Tuple[str, bytes]
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """
+    Check a topic against an MQTT subscription filter.
+
+    Args:
+        topic_filter: Filter, possibly with + and # wildcards
+        topic: Concrete topic name
+
+    Returns:
+        True if the topic matches the filter
+    """
+    filter_parts = topic_filter.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(filter_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[i]:
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+class MQTTTransport(ABC):
+    """Minimal async MQTT client interface used by the bridge."""
+
+    @abstractmethod
+    async def connect(self) -> None:
+        """Connect to the broker."""
+
+    @abstractmethod
+    async def subscribe(self, topic_filter: str) -> None:
+        """Subscribe to a topic filter."""
+
+    @abstractmethod
+    async def publish(self, topic: str, payload: bytes,
+                      retain: bool = False) -> None:
+        """Publish a message."""
+
+    @abstractmethod
+    def messages(self) -> AsyncIterator[Message]:
+        """Iterate over received (topic, payload) messages."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Disconnect from the broker."""
+
+
+class _QueueTransport(MQTTTransport):
+    """Transport delivering received messages through an asyncio queue."""
+
+    def __init__(self) -> None:
+        """Initialize the transport without a queue."""
+        self._queue: Optional['asyncio.Queue[Message]'] = None
+
+    async def connect(self) -> None:
+        """Create the receive queue on the running event loop."""
+        self._queue = asyncio.Queue()
+
+    async def messages(self) -> AsyncIterator[Message]:
+        """
+        Iterate over received messages.
+
+        Yields:
+            (topic, payload) tuples in arrival order
+
+        Raises:
+            RuntimeError: If the transport is not connected
+        """
+        if self._queue is None:
+            raise RuntimeError('Transport is not connected')
+        while True:
+            yield await self._queue.get()
+
+
+class LocalBroker:
+    """In-process MQTT broker stand-in with retained messages."""
+
+    def __init__(self) -> None:
+        """Initialize an empty broker."""
+        self.retained: Dict[str, bytes] = {}
+        self._clients: List['LocalBrokerClient'] = []
+
+    def client(self) -> 'LocalBrokerClient':
+        """Create a transport connected to this broker."""
+        return LocalBrokerClient(self)
+
+    def _route(self, topic: str, payload: bytes, retain: bool) -> None:
+        """Store retained messages and deliver to matching subscribers."""
+        if retain:
+            if payload:
+                self.retained[topic] = payload
+            else:
+                self.retained.pop(topic, None)
+        for client in self._clients:
+            client._deliver(topic, payload)
+
+
+class LocalBrokerClient(_QueueTransport):
+    """Transport attached to a LocalBroker."""
+
+    def __init__(self, broker: LocalBroker) -> None:
+        """
+        Initialize the client.
+
+        Args:
+            broker: Broker to attach to
+        """
+        super().__init__()
+        self.broker = broker
+        self.filters: List[str] = []
+
+    async def connect(self) -> None:
+        """Attach to the broker."""
+        await super().connect()
+        self.broker._clients.append(self)
+
+    async def subscribe(self, topic_filter: str) -> None:
+        """Subscribe and receive matching retained messages."""
+        self.filters.append(topic_filter)
+        for topic, payload in self.broker.retained.items():
+            if topic_matches(topic_filter, topic) and self._queue is not None:
+                self._queue.put_nowait((topic, payload))
+
+    async def publish(self, topic: str, payload: bytes,
+                      retain: bool = False) -> None:
+        """Publish through the broker."""
+        self.broker._route(topic, payload, retain)
+
+    async def close(self) -> None:
+        """Detach from the broker."""
+        if self in self.broker._clients:
+            self.broker._clients.remove(self)
+
+    def _deliver(self, topic: str, payload: bytes) -> None:
+        """Queue a message if it matches one of our subscriptions."""
+        if self._queue is not None and any(
+                topic_matches(f, topic) for f in self.filters):
+            self._queue.put_nowait((topic, payload))
+
+
+class PahoTransport(_QueueTransport):
+    """Transport backed by paho-mqtt running its own network thread."""
+
+    def __init__(self, host: str, port: int = 1883,
+                 username: Optional[str] = None,
+                 password: Optional[str] = None):
+        """
+        Initialize the transport.
+
+        Args:
+            host: Broker host name
+            port: Broker port (default: 1883)
+            username: Optional broker user name
+            password: Optional broker password
+        """
+        super().__init__()
+        self.host = host
+        self.port = port
+        self._filters: List[str] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = mqtt.Client()
+        if username:
+            self._client.username_pw_set(username, password)
+        self._client.on_connect = self._on_connect
+        self._client.on_message = self._on_message
+
+    async def connect(self) -> None:
+        """Start connecting in the background; reconnects are automatic."""
+        await super().connect()
+        self._loop = asyncio.get_running_loop()
+        self._client.connect_async(self.host, self.port)
+        self._client.loop_start()
+
+    async def subscribe(self, topic_filter: str) -> None:
+        """Subscribe now and again after every reconnect."""
+        self._filters.append(topic_filter)
+        self._client.subscribe(topic_filter)
+
+    async def publish(self, topic: str, payload: bytes,
+                      retain: bool = False) -> None:
+        """Publish a message."""
+        self._client.publish(topic, payload, retain=retain)
+
+    async def close(self) -> None:
+        """Disconnect and stop the network thread."""
+        self._client.disconnect()
+        self._client.loop_stop()
+
+    def _on_connect(self, client: object, userdata: object, flags: object,
+                    rc: int) -> None:
+        """Restore subscriptions after (re)connecting."""
+        if rc != 0:
+            logger.error(f'MQTT connection refused: {rc}')
+            return
+        for topic_filter in self._filters:
+            self._client.subscribe(topic_filter)
+
+    def _on_message(self, client: object, userdata: object,
+                    message: object) -> None:
+        """Hand a message from the network thread to the event loop."""
+        if self._loop is not None and self._queue is not None:
+            self._loop.call_soon_threadsafe(
+                self._queue.put_nowait,
+                (message.topic, message.payload)  # type: ignore
+            )
+
+
+@dataclass
+class _PendingWrite:
+    """Queued writes and receive times of messages waiting for a flush."""
+
+    writes: List[Dict] = field(default_factory=list)
+    received: List[float] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class BridgeStats:
+    """Throughput and latency counters of the MQTT bridge."""
+
+    def __init__(self) -> None:
+        """Initialize empty counters."""
+        self.started = time.perf_counter()
+        self.messages = 0
+        self.invalid = 0
+        self.writes = 0
+        self.failures = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def to_dict(self) -> Dict:
+        """Summarize the counters as a JSON-serializable dictionary."""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(len(latencies) * fraction))
+            return round(latencies[index] * 1000, 2)
+
+        return {
+            'messages': self.messages,
+            'invalid': self.invalid,
+            'writes': self.writes,
+            'failures': self.failures,
+            'messages_per_sec': round(self.messages / elapsed, 2),
+            'latency_ms': {
+                'avg': (round(sum(latencies) / len(latencies) * 1000, 2)
+                        if latencies else None),
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': percentile(1.0),
+            },
+        }
+
+
+class MQTTBridge:
+    """
+    Bridges MQTT command topics to WLED devices.
+
+    Messages on ``<prefix>/device/<name>/set`` and
+    ``<prefix>/group/<group>/set`` carry JSON state patches. Consecutive
+    literal patches for a device arriving within ``window`` seconds of the
+    first are merged into one write, so repeated fields are sent once.
+    Nothing is dropped against the cached device state, which may be stale
+    after changes made outside the app. Toggles, relative values and
+    segment objects are sent unmerged, in order. The resulting state is
+    published retained on ``<prefix>/device/<name>/state``.
+    """
+
+    def __init__(self, transport: MQTTTransport,
+                 devices: Dict[str, WLEDClient],
+                 groups: Optional[Dict[str, List[str]]] = None,
+                 prefix: str = 'wled', window: float = 0.05):
+        """
+        Initialize the bridge.
+
+        Args:
+            transport: MQTT connection
+            devices: WLED clients by device name
+            groups: Device names by group name
+            prefix: Topic prefix (default: wled)
+            window: Seconds to collect messages before writing
+        """
+        self.transport = transport
+        self.devices = devices
+        self.groups = groups or {}
+        self.prefix = prefix.rstrip('/')
+        self.window = window
+        self.stats = BridgeStats()
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._flushes: Set['asyncio.Task[None]'] = set()
+        self._task: Optional['asyncio.Task[None]'] = None
+
+    async def start(self) -> None:
+        """Connect, subscribe to command topics and start processing."""
+        await self.transport.connect()
+        await self.transport.subscribe(f'{self.prefix}/device/+/set')
+        await self.transport.subscribe(f'{self.prefix}/group/+/set')
+        self.stats = BridgeStats()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop processing, write out pending patches and disconnect."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for device in list(self._pending):
+            await self.flush(device)
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+        await self.transport.close()
+
+    async def _run(self) -> None:
+        """Handle messages until cancelled."""
+        async for topic, payload in self.transport.messages():
+            self.handle(topic, payload)
+
+    def _targets(self, topic: str) -> Optional[List[str]]:
+        """Resolve a command topic to device names."""
+        if not topic.startswith(f'{self.prefix}/'):
+            return None
+        parts = topic[len(self.prefix) + 1:].split('/')
+        if len(parts) != 3 or parts[2] != 'set':
+            return None
+        kind, name = parts[0], parts[1]
+        if kind == 'device' and name in self.devices:
+            return [name]
+        if kind == 'group' and name in self.groups:
+            return [device for device in self.groups[name]
+                    if device in self.devices]
+        return None
+
+    def handle(self, topic: str, payload: bytes) -> None:
+        """
+        Queue a command message for its devices.
+
+        Args:
+            topic: Topic the message arrived on
+            payload: JSON state patch
+        """
+        received = time.perf_counter()
+        self.stats.messages += 1
+        targets = self._targets(topic)
+        try:
+            patch = json.loads(payload)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            patch = None
+        if targets is None or not isinstance(patch, dict):
+            self.stats.invalid += 1
+            logger.warning(f'Ignoring MQTT message on {topic}')
+            return
+
+        loop = asyncio.get_running_loop()
+        for device in targets:
+            pending = self._pending.get(device)
+            if pending is None:
+                pending = self._pending[device] = _PendingWrite()
+                pending.timer = loop.call_later(self.window,
+                                                self._schedule_flush, device)
+            writes = pending.writes
+            if writes and is_literal(writes[-1]) and is_literal(patch):
+                writes[-1] = merge_patch(writes[-1], patch)
+            else:
+                writes.append(patch)
+            pending.received.append(received)
+
+    def _schedule_flush(self, device: str) -> None:
+        """Start a flush task for a device and keep a reference to it."""
+        task = asyncio.create_task(self.flush(device))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self, device: str) -> None:
+        """
+        Send a device's pending writes and publish its state.
+
+        Writes are sent in order. If one fails, the device's remaining
+        queued writes are discarded (later toggles or relative steps would
+        apply to an unknown state), a warning is logged and no state is
+        published.
+
+        Args:
+            device: Device name
+        """
+        lock = self._locks.setdefault(device, asyncio.Lock())
+        async with lock:
+            pending = self._pending.pop(device, None)
+            if pending is None:
+                return
+            if pending.timer is not None:
+                pending.timer.cancel()
+
+            client = self.devices[device]
+            for sent, write in enumerate(pending.writes, 1):
+                self.stats.writes += 1
+                if not await asyncio.to_thread(client.set_state, write):
+                    self.stats.failures += 1
+                    dropped = len(pending.writes) - sent
+                    logger.warning(f'MQTT write to {device} failed; '
+                                   f'dropped {dropped} queued writes')
+                    return
+
+            done = time.perf_counter()
+            self.stats.latencies.extend(done - received
+                                        for received in pending.received)
+
+            state = client.last_state
+            if state is None:
+                state = await asyncio.to_thread(client.get_state)
+            if state is None:
+                return
+            await self.transport.publish(
+                f'{self.prefix}/device/{device}/state',
+                json.dumps(state, separators=(',', ':')).encode('utf-8'),
+                retain=True
+            )
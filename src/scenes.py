@@ -0,0 +1,179 @@
+"""Local scene store and concurrent multi-device scene application."""
+
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from .state_diff import diff_state, replayable_state
+from .wled_client import WLEDClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceApplyResult:
+    """Outcome of applying a scene to one device."""
+
+    device: str
+    success: bool
+    latency_ms: float
+    changed: Dict = field(default_factory=dict)
+
+
+@dataclass
+class SceneApplyResult:
+    """Outcome of applying a scene to a set of devices."""
+
+    scene: str
+    total_ms: float
+    devices: List[DeviceApplyResult]
+
+    @property
+    def success(self) -> bool:
+        """True if every device applied the scene."""
+        return all(result.success for result in self.devices)
+
+    def to_dict(self) -> Dict:
+        """Convert the result into a JSON-serializable dictionary."""
+        latencies = [result.latency_ms for result in self.devices]
+        return {
+            'scene': self.scene,
+            'success': self.success,
+            'total_ms': self.total_ms,
+            'max_device_ms': max(latencies, default=0.0),
+            'devices': [asdict(result) for result in self.devices],
+        }
+
+
+class SceneStore:
+    """SQLite-backed store of full WLED state snapshots."""
+
+    def __init__(self, path: str = 'scenes.db'):
+        """
+        Initialize the scene store.
+
+        Args:
+            path: SQLite database file (default: scenes.db)
+        """
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS scenes ('
+                'name TEXT PRIMARY KEY, '
+                'state TEXT NOT NULL, '
+                'updated REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the scene database."""
+        return sqlite3.connect(self.path)
+
+    def save(self, name: str, state: Dict) -> Dict:
+        """
+        Save (or replace) a scene.
+
+        Args:
+            name: Scene name
+            state: Full state snapshot as returned by get_state()
+
+        Returns:
+            The stored snapshot with non-replayable keys removed
+        """
+        snapshot = replayable_state(state)
+        payload = json.dumps(snapshot, separators=(',', ':'))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO scenes (name, state, updated) '
+                'VALUES (?, ?, ?)',
+                (name, payload, time.time())
+            )
+        return snapshot
+
+    def get(self, name: str) -> Optional[Dict]:
+        """
+        Load a scene.
+
+        Args:
+            name: Scene name
+
+        Returns:
+            State snapshot or None if no such scene exists
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT state FROM scenes WHERE name = ?',
+                               (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def names(self) -> List[str]:
+        """
+        List stored scene names.
+
+        Returns:
+            Scene names in alphabetical order
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT name FROM scenes ORDER BY name')
+            return [row[0] for row in rows]
+
+    def delete(self, name: str) -> bool:
+        """
+        Delete a scene.
+
+        Args:
+            name: Scene name
+
+        Returns:
+            True if the scene existed, False otherwise
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute('DELETE FROM scenes WHERE name = ?', (name,))
+            return cursor.rowcount > 0
+
+
+def _apply_to_device(name: str, client: WLEDClient,
+                     scene: Dict) -> DeviceApplyResult:
+    """Send one device the minimal patch that brings it to a scene."""
+    start = time.perf_counter()
+    current = client.get_state()
+    if current is None:
+        elapsed = (time.perf_counter() - start) * 1000
+        return DeviceApplyResult(name, False, round(elapsed, 2))
+
+    patch = diff_state(current, scene)
+    success = client.set_state(patch) if patch else True
+    elapsed = (time.perf_counter() - start) * 1000
+    return DeviceApplyResult(name, success, round(elapsed, 2), patch)
+
+
+def apply_scene(name: str, scene: Dict, clients: Dict[str, WLEDClient],
+                max_workers: int = 16) -> SceneApplyResult:
+    """
+    Apply a scene to many devices concurrently.
+
+    Each device's current state is read in its worker, so changes made
+    outside this app are seen, and only the changed fields are sent.
+
+    Args:
+        name: Scene name (for reporting)
+        scene: State snapshot to apply
+        clients: Target devices by name
+        max_workers: Maximum number of concurrent device requests
+
+    Returns:
+        Per-device results and overall latency
+    """
+    start = time.perf_counter()
+    workers = max(1, min(max_workers, len(clients)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_apply_to_device, device, client, scene)
+                   for device, client in clients.items()]
+        results = [future.result() for future in futures]
+    total = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(f'Applied scene {name} to {len(results)} devices '
+                f'in {total} ms')
+    return SceneApplyResult(name, total, results)
@@ -0,0 +1,184 @@
+"""Helpers for diffing and merging WLED state dictionaries."""
+
+import copy
+from typing import Any, Dict, List
+
+# State keys that must not be replayed: sending them would load presets or
+# playlists on the device instead of restoring the captured state.
+NON_REPLAYABLE_KEYS = ('ps', 'pl', 'tb', 'error')
+
+
+def replayable_state(state: Dict) -> Dict:
+    """
+    Strip keys that must not be sent back to a device.
+
+    Args:
+        state: Full state or patch
+
+    Returns:
+        New dictionary without preset, playlist and read-only keys
+    """
+    return {key: value for key, value in state.items()
+            if key not in NON_REPLAYABLE_KEYS}
+
+
+def _segment_id(segment: Dict, index: int) -> Any:
+    """Get the id of a segment, falling back to its list position."""
+    return segment.get('id', index)
+
+
+def _diff_segments(current: List[Dict], target: List[Dict]) -> List[Dict]:
+    """
+    Diff two segment lists by segment id.
+
+    Args:
+        current: Segments currently on the device
+        target: Desired segments
+
+    Returns:
+        Segment patches; segments missing from target are deleted (stop=0)
+    """
+    current_by_id = {_segment_id(seg, i): seg for i, seg in enumerate(current)}
+    patches = []
+    target_ids = set()
+    for i, segment in enumerate(target):
+        seg_id = _segment_id(segment, i)
+        target_ids.add(seg_id)
+        patch = diff_state(current_by_id.get(seg_id, {}), segment)
+        if patch:
+            patch['id'] = seg_id
+            patches.append(patch)
+    for seg_id in current_by_id:
+        if seg_id not in target_ids:
+            patches.append({'id': seg_id, 'stop': 0})
+    return patches
+
+
+def diff_state(current: Dict, target: Dict) -> Dict:
+    """
+    Compute the minimal patch that turns one state into another.
+
+    Nested objects are diffed recursively and segments are matched by id.
+    Keys only present in current are left alone, except segments which
+    are deleted so that the segment layout matches target.
+
+    Args:
+        current: State currently on the device
+        target: Desired state
+
+    Returns:
+        Patch dictionary (empty if nothing changed)
+    """
+    patch: Dict = {}
+    for key, value in target.items():
+        old = current.get(key)
+        if key == 'seg' and isinstance(value, list):
+            segments = _diff_segments(old if isinstance(old, list) else [],
+                                      value)
+            if segments:
+                patch[key] = segments
+        elif isinstance(value, dict) and isinstance(old, dict):
+            nested = diff_state(old, value)
+            if nested:
+                patch[key] = nested
+        elif old != value:
+            patch[key] = copy.deepcopy(value)
+    return patch
+
+
+def merge_state(state: Dict, patch: Dict) -> Dict:
+    """
+    Apply a state patch the way a WLED device would.
+
+    Args:
+        state: Base state
+        patch: Patch to apply
+
+    Returns:
+        New merged state (inputs are not modified)
+    """
+    merged = copy.deepcopy(state)
+    for key, value in patch.items():
+        old = merged.get(key)
+        if key == 'seg' and isinstance(old, list):
+            patches = value if isinstance(value, list) else [value]
+            merged[key] = _merge_segments(old, patches)
+        elif isinstance(value, dict) and isinstance(old, dict):
+            merged[key] = merge_state(old, value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _merge_segments(segments: List[Dict], patches: List[Dict]) -> List[Dict]:
+    """Merge segment patches into a segment list by segment id."""
+    by_id = {_segment_id(seg, i): seg for i, seg in enumerate(segments)}
+    for i, patch in enumerate(patches):
+        seg_id = _segment_id(patch, i)
+        if patch.get('stop') == 0:
+            by_id.pop(seg_id, None)
+            continue
+        base = by_id.get(seg_id, {'id': seg_id})
+        by_id[seg_id] = merge_state(base, patch)
+    return list(by_id.values())
+
+
+def is_literal(patch: Dict) -> bool:
+    """
+    Check whether a patch only sets absolute values.
+
+    WLED also accepts commands whose effect depends on the current state:
+    toggles ('t'), relative steps and cycles (strings containing '~') and
+    a 'seg' object, which applies to all selected segments. Such patches
+    can neither be merged with others nor predicted from a cached state.
+
+    Args:
+        patch: State patch
+
+    Returns:
+        True if every value in the patch is absolute
+    """
+    for key, value in patch.items():
+        if key == 'seg' and isinstance(value, dict):
+            return False
+        if isinstance(value, str) and (value == 't' or '~' in value):
+            return False
+        if isinstance(value, dict) and not is_literal(value):
+            return False
+        if isinstance(value, list) and not all(
+                is_literal(item) for item in value if isinstance(item, dict)):
+            return False
+    return True
+
+
+def merge_patch(base: Dict, patch: Dict) -> Dict:
+    """
+    Combine two literal patches into one, later values winning.
+
+    Unlike merge_state, segment deletions (stop=0) are kept so that the
+    combined patch still carries them to the device. Merged segments
+    always carry an explicit id.
+
+    Args:
+        base: Earlier patch
+        patch: Later patch
+
+    Returns:
+        New combined patch (inputs are not modified)
+    """
+    merged = copy.deepcopy(base)
+    for key, value in patch.items():
+        old = merged.get(key)
+        if key == 'seg' and isinstance(old, list) and isinstance(value, list):
+            by_id = {_segment_id(seg, i): dict(seg, id=_segment_id(seg, i))
+                     for i, seg in enumerate(old)}
+            for i, segment in enumerate(value):
+                seg_id = _segment_id(segment, i)
+                by_id[seg_id] = merge_patch(by_id.get(seg_id, {}), segment)
+                by_id[seg_id]['id'] = seg_id
+            merged[key] = list(by_id.values())
+        elif isinstance(value, dict) and isinstance(old, dict):
+            merged[key] = merge_patch(old, value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
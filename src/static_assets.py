@@ -0,0 +1,248 @@
+"""Precompressed, content-hashed static asset delivery."""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+HASH_LENGTH = 12
+MIN_COMPRESS_SIZE = 256
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/javascript',
+    'application/json',
+    'image/svg+xml',
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Asset:
+    """A static asset held in memory with its precompressed variants."""
+
+    path: str
+    media_type: str
+    digest: str
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def from_bytes(cls, path: str, body: bytes,
+                   media_type: Optional[str] = None) -> 'Asset':
+        """
+        Build an asset and precompress it.
+
+        Args:
+            path: Logical asset path (e.g. app.js)
+            body: Uncompressed asset content
+            media_type: Content type (guessed from the path if omitted)
+
+        Returns:
+            Asset with identity, gzip and (if available) brotli variants
+        """
+        if media_type is None:
+            media_type = (mimetypes.guess_type(path)[0]
+                          or 'application/octet-stream')
+        digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        asset = cls(path=path, media_type=media_type, digest=digest,
+                    variants={'identity': body})
+
+        if (len(body) >= MIN_COMPRESS_SIZE
+                and media_type.startswith(COMPRESSIBLE_TYPES)):
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) < len(body):
+                asset.variants['gzip'] = gzipped
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    asset.variants['br'] = compressed
+        return asset
+
+    @property
+    def hashed_path(self) -> str:
+        """Path with the content hash inserted before the extension."""
+        stem, ext = os.path.splitext(self.path)
+        return f'{stem}.{self.digest}{ext}'
+
+    def etag(self, encoding: str) -> str:
+        """
+        Get the entity tag of one encoded variant.
+
+        Args:
+            encoding: Content encoding of the variant
+
+        Returns:
+            Quoted strong ETag, unique per encoding
+        """
+        if encoding == 'identity':
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+
+def select_encoding(accept_encoding: str, available: List[str]) -> str:
+    """
+    Choose the best precompressed variant for an Accept-Encoding header.
+
+    The available encoding with the highest q-value wins; br is preferred
+    on ties. Encodings listed with q=0 are never chosen, not even via '*'.
+
+    Args:
+        accept_encoding: Raw Accept-Encoding request header
+        available: Encodings the asset has variants for
+
+    Returns:
+        Encoding to serve ('br', 'gzip' or 'identity')
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    weight = float(value.strip())
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = 'identity', 0.0
+    for encoding in ('br', 'gzip'):
+        if encoding not in available:
+            continue
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+
+    Args:
+        if_none_match: Raw If-None-Match request header
+        etag: Current entity tag
+
+    Returns:
+        True if the client's cached copy is still valid
+    """
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in [tag[2:] if tag.startswith('W/') else tag
+                    for tag in candidates]
+
+
+def asset_response(asset: Asset, request: Request,
+                   cache_control: str) -> Response:
+    """
+    Build a response for an asset honouring content negotiation and ETags.
+
+    Args:
+        asset: Asset to serve
+        request: Incoming request
+        cache_control: Cache-Control header value
+
+    Returns:
+        200 response with the negotiated variant, or 304 if not modified
+    """
+    encoding = select_encoding(request.headers.get('accept-encoding', ''),
+                               list(asset.variants))
+    etag = asset.etag(encoding)
+    headers = {
+        'ETag': etag,
+        'Cache-Control': cache_control,
+        'Vary': 'Accept-Encoding',
+    }
+
+    if etag_matches(request.headers.get('if-none-match', ''), etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(content=asset.variants[encoding],
+                    media_type=asset.media_type, headers=headers)
+
+
+class StaticAssetCache:
+    """In-memory store of precompressed static assets."""
+
+    def __init__(self, directory: str):
+        """
+        Initialize the asset cache.
+
+        Args:
+            directory: Directory holding the static files
+        """
+        self.directory = directory
+        self._assets: Dict[str, Asset] = {}
+        self._hashed: Dict[str, Asset] = {}
+
+    def load(self) -> None:
+        """Read, hash and precompress every file below the directory."""
+        self._assets.clear()
+        self._hashed.clear()
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                full_path = os.path.join(root, filename)
+                path = os.path.relpath(full_path, self.directory)
+                path = path.replace(os.sep, '/')
+                with open(full_path, 'rb') as f:
+                    asset = Asset.from_bytes(path, f.read())
+                self._assets[path] = asset
+                self._hashed[asset.hashed_path] = asset
+        logger.info(f'Loaded {len(self._assets)} static assets')
+
+    def url_for(self, path: str) -> str:
+        """
+        Get the content-hashed URL of an asset.
+
+        Args:
+            path: Logical asset path (e.g. app.js)
+
+        Returns:
+            Hashed URL, or the plain URL if the asset is unknown
+        """
+        asset = self._assets.get(path)
+        if asset is None:
+            return f'/static/{path}'
+        return f'/static/{asset.hashed_path}'
+
+    def response(self, path: str, request: Request) -> Optional[Response]:
+        """
+        Serve an asset by hashed or plain path.
+
+        Hashed paths never change content and are cached forever; plain
+        paths must be revalidated with the ETag.
+
+        Args:
+            path: Requested path below /static/
+            request: Incoming request
+
+        Returns:
+            Response, or None if no such asset exists
+        """
+        asset = self._hashed.get(path)
+        if asset is not None:
+            return asset_response(asset, request, IMMUTABLE_CACHE_CONTROL)
+        asset = self._assets.get(path)
+        if asset is not None:
+            return asset_response(asset, request, REVALIDATE_CACHE_CONTROL)
+        return None
@@ -0,0 +1,135 @@
+"""Time-synchronized command application across several WLED devices."""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from .wled_client import WLEDClient
+
+# Time given to worker threads to start before the first command is sent
+SCHEDULE_LEAD = 0.02
+# Remaining wait below which the scheduler spins instead of sleeping
+SPIN_THRESHOLD = 0.002
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceSyncResult:
+    """Timing of one device in a synchronized apply."""
+
+    device: str
+    success: bool
+    rtt_ms: float
+    send_offset_ms: float
+    applied_at_ms: float
+
+
+@dataclass
+class SyncApplyResult:
+    """Outcome of a synchronized apply across devices."""
+
+    target_skew_ms: float
+    skew_ms: float
+    devices: List[DeviceSyncResult]
+
+    @property
+    def success(self) -> bool:
+        """True if every device accepted the command."""
+        return all(result.success for result in self.devices)
+
+    @property
+    def within_target(self) -> bool:
+        """True if the estimated skew met the target."""
+        return self.skew_ms <= self.target_skew_ms
+
+    def to_dict(self) -> Dict:
+        """Convert the result into a JSON-serializable dictionary."""
+        return {
+            'success': self.success,
+            'target_skew_ms': self.target_skew_ms,
+            'skew_ms': self.skew_ms,
+            'within_target': self.within_target,
+            'devices': [asdict(result) for result in self.devices],
+        }
+
+
+def _wait_until(deadline: float) -> None:
+    """Sleep until a perf_counter deadline, spinning for the last stretch."""
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_THRESHOLD:
+            time.sleep(remaining - SPIN_THRESHOLD)
+
+
+def _probe(client: WLEDClient, samples: int) -> Optional[float]:
+    """Return a device's round-trip time, measuring it if unknown."""
+    if client.rtt is not None:
+        return client.rtt
+    return client.measure_latency(samples)
+
+
+def synchronized_apply(clients: Dict[str, WLEDClient],
+                       command: Callable[[WLEDClient], bool],
+                       target_skew_ms: float = 10.0,
+                       probe_samples: int = 3) -> SyncApplyResult:
+    """
+    Run a command on several devices so that it lands on all at once.
+
+    Each device's one-way latency is estimated as half its smoothed
+    round-trip time. Commands to slower devices are sent earlier so that
+    all of them are expected to arrive when the slowest one does. The
+    achieved skew is estimated from the round-trip time of the actual
+    command requests.
+
+    Args:
+        clients: Target devices by name
+        command: Setter to run per device, e.g. lambda c: c.set_effect(5)
+        target_skew_ms: Acceptable spread of apply times in milliseconds
+        probe_samples: Requests used to measure devices with no RTT yet
+
+    Returns:
+        Per-device timing and the estimated skew
+    """
+    if not clients:
+        return SyncApplyResult(target_skew_ms, 0.0, [])
+
+    names = list(clients)
+    with ThreadPoolExecutor(max_workers=len(names)) as executor:
+        rtts = list(executor.map(
+            lambda name: _probe(clients[name], probe_samples), names
+        ))
+
+        reachable = [rtt for rtt in rtts if rtt is not None]
+        latest_arrival = max(reachable, default=0.0) / 2
+        start = time.perf_counter() + SCHEDULE_LEAD
+
+        def send(index: int) -> DeviceSyncResult:
+            name, rtt = names[index], rtts[index]
+            if rtt is None:
+                return DeviceSyncResult(name, False, 0.0, 0.0, 0.0)
+            offset = latest_arrival - rtt / 2
+            _wait_until(start + offset)
+            sent = time.perf_counter()
+            success = command(clients[name])
+            elapsed = time.perf_counter() - sent
+            applied = sent + elapsed / 2 - start
+            return DeviceSyncResult(name, success,
+                                    round(elapsed * 1000, 2),
+                                    round(offset * 1000, 2),
+                                    round(applied * 1000, 2))
+
+        results = list(executor.map(send, range(len(names))))
+
+    applied_times = [result.applied_at_ms for result in results
+                     if result.success]
+    skew = (max(applied_times) - min(applied_times)) if applied_times else 0.0
+    result = SyncApplyResult(target_skew_ms, round(skew, 2), results)
+    if not result.within_target:
+        logger.warning(f'Synchronized apply skew {result.skew_ms} ms exceeds '
+                       f'target {target_skew_ms} ms')
+    return result
@@ -0,0 +1,388 @@
+"""Append-only state timeline log with seekable, accelerated replay.
+
+File layout: a 5-byte header (magic and version) followed by records of
+the form ``<timestamp f64><device u16><kind u8><length u32><payload>``.
+Payloads are compact JSON. Delta records hold only the fields that changed
+since the previous record of the same device. Checkpoint records hold
+every device's full state and are listed in a ``.idx`` sidecar file of
+``<timestamp f64><offset u64>`` entries, so a reader can jump to any
+timestamp by bisecting the index and replaying a bounded number of deltas.
+Command records hold a toggle, relative or segment-object write verbatim;
+its effect is unknown, so the device's reconstructed state is dropped until
+the next full poll.
+"""
+
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from .state_diff import diff_state, is_literal, merge_state, replayable_state
+from .wled_client import WLEDClient
+
+MAGIC = b'WLTL\x01'
+RECORD_HEADER = struct.Struct('<dHBI')
+INDEX_ENTRY = struct.Struct('<dQ')
+KIND_DEVICE = 0
+KIND_DELTA = 1
+KIND_CHECKPOINT = 2
+KIND_COMMAND = 3
+CHECKPOINT_INTERVAL = 256
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(data: object) -> bytes:
+    """Serialize a payload as compact JSON."""
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+@dataclass
+class TimelineEvent:
+    """A state change of one device at one point in time."""
+
+    timestamp: float
+    device: str
+    patch: Dict
+
+
+class TimelineReader:
+    """Memory-mapped reader for a timeline log."""
+
+    def __init__(self, path: str):
+        """
+        Open a timeline log for reading.
+
+        Args:
+            path: Timeline log file
+
+        Raises:
+            ValueError: If the file is not a timeline log
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._data: Union[mmap.mmap, bytes] = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if size else b''
+            )
+        if self._data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'Not a timeline log: {path}')
+        self._index = self._load_index()
+
+    def close(self) -> None:
+        """Release the memory map."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def _load_index(self) -> List[Tuple[float, int]]:
+        """Read the checkpoint index, rebuilding it by scan if missing."""
+        index_path = f'{self.path}.idx'
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % INDEX_ENTRY.size
+            return [(ts, offset)
+                    for ts, offset in INDEX_ENTRY.iter_unpack(raw[:usable])
+                    if offset < len(self._data)]
+        return [(ts, offset) for offset, ts, _, kind, _ in self._records()
+                if kind == KIND_CHECKPOINT]
+
+    def _records(self, offset: int = len(MAGIC)
+                 ) -> Iterator[Tuple[int, float, int, int, bytes]]:
+        """Yield (offset, timestamp, device, kind, payload) from an offset."""
+        end = len(self._data)
+        while offset + RECORD_HEADER.size <= end:
+            ts, device, kind, length = RECORD_HEADER.unpack_from(
+                self._data, offset)
+            start = offset + RECORD_HEADER.size
+            if start + length > end:
+                break
+            payload = bytes(self._data[start:start + length])
+            yield offset, ts, device, kind, payload
+            offset = start + length
+
+    @property
+    def checkpoints(self) -> int:
+        """Number of indexed checkpoints."""
+        return len(self._index)
+
+    def span(self) -> Optional[Tuple[float, float]]:
+        """
+        Get the time range covered by the log.
+
+        Returns:
+            (first, last) timestamps or None if the log is empty
+        """
+        first = last = None
+        start = self._index[-1][1] if self._index else len(MAGIC)
+        for _, ts, _, _, _ in self._records(len(MAGIC)):
+            first = ts
+            break
+        for _, ts, _, _, _ in self._records(start):
+            last = ts
+        if first is None or last is None:
+            return None
+        return first, last
+
+    def seek(self, timestamp: float
+             ) -> Tuple[List[str], Dict[int, Dict], int]:
+        """
+        Reconstruct every device's state at a point in time.
+
+        Args:
+            timestamp: Point in time (seconds since the epoch)
+
+        Returns:
+            (device names, states by device index, offset of the first
+            record after the timestamp)
+        """
+        devices: List[str] = []
+        states: Dict[int, Dict] = {}
+        offset = len(MAGIC)
+
+        position = bisect.bisect_right([ts for ts, _ in self._index],
+                                       timestamp)
+        if position:
+            offset = self._index[position - 1][1]
+
+        for record_offset, ts, device, kind, payload in self._records(offset):
+            if ts > timestamp:
+                return devices, states, record_offset
+            offset = record_offset + RECORD_HEADER.size + len(payload)
+            self._apply(devices, states, device, kind, payload)
+        return devices, states, offset
+
+    @staticmethod
+    def _apply(devices: List[str], states: Dict[int, Dict], device: int,
+               kind: int, payload: bytes) -> Optional[Dict]:
+        """Apply one record to reconstructed state; return a delta if any."""
+        data = json.loads(payload)
+        if kind == KIND_DEVICE:
+            devices.extend([''] * (device + 1 - len(devices)))
+            devices[device] = data
+        elif kind == KIND_CHECKPOINT:
+            devices[:] = data['devices']
+            states.clear()
+            states.update({int(k): v for k, v in data['states'].items()})
+        elif kind == KIND_DELTA:
+            states[device] = merge_state(states.get(device, {}), data)
+            return dict(data)
+        elif kind == KIND_COMMAND:
+            states.pop(device, None)
+            return dict(data)
+        return None
+
+    def events(self, start: Optional[float] = None,
+               end: Optional[float] = None) -> Iterator[TimelineEvent]:
+        """
+        Iterate over state changes in a time range.
+
+        When starting mid-log, the first events carry each device's full
+        state at the start time so that replay begins from a correct state.
+        Preset and playlist keys are stripped from these snapshots.
+
+        Args:
+            start: First timestamp to include (default: beginning of log)
+            end: Last timestamp to include (default: end of log)
+
+        Yields:
+            Timeline events in chronological order
+        """
+        devices: List[str] = []
+        states: Dict[int, Dict] = {}
+        offset = len(MAGIC)
+        if start is not None:
+            devices, states, offset = self.seek(start)
+            for device, state in sorted(states.items()):
+                yield TimelineEvent(start, devices[device],
+                                    replayable_state(state))
+
+        for _, ts, device, kind, payload in self._records(offset):
+            if end is not None and ts > end:
+                return
+            patch = self._apply(devices, states, device, kind, payload)
+            if patch is not None:
+                yield TimelineEvent(ts, devices[device], patch)
+
+
+class TimelineRecorder:
+    """Records observed device state changes into a timeline log."""
+
+    def __init__(self, path: str,
+                 checkpoint_interval: int = CHECKPOINT_INTERVAL):
+        """
+        Open (or create) a timeline log for appending.
+
+        Args:
+            path: Timeline log file
+            checkpoint_interval: Delta records between full checkpoints
+        """
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._devices: Dict[str, int] = {}
+        self._states: Dict[int, Dict] = {}
+        self._since_checkpoint = 0
+
+        if os.path.exists(path) and os.path.getsize(path):
+            reader = TimelineReader(path)
+            try:
+                names, self._states, _ = reader.seek(float('inf'))
+            finally:
+                reader.close()
+            self._devices = {name: i for i, name in enumerate(names)}
+            self._log = open(path, 'ab')
+        else:
+            self._log = open(path, 'wb')
+            self._log.write(MAGIC)
+            self._log.flush()
+        self._index = open(f'{path}.idx', 'ab')
+
+    def close(self) -> None:
+        """Flush and close the log files."""
+        with self._lock:
+            self._log.close()
+            self._index.close()
+
+    def _write(self, timestamp: float, device: int, kind: int,
+               payload: bytes) -> int:
+        """Append one record and return its offset."""
+        offset = self._log.tell()
+        self._log.write(RECORD_HEADER.pack(timestamp, device, kind,
+                                           len(payload)))
+        self._log.write(payload)
+        return offset
+
+    def _checkpoint(self, timestamp: float) -> None:
+        """Write a full-state checkpoint and index it."""
+        names = sorted(self._devices, key=self._devices.__getitem__)
+        payload = _encode({'devices': names, 'states': self._states})
+        offset = self._write(timestamp, 0, KIND_CHECKPOINT, payload)
+        self._index.write(INDEX_ENTRY.pack(timestamp, offset))
+        self._index.flush()
+        self._since_checkpoint = 0
+
+    def record(self, client: WLEDClient, state: Dict, source: str) -> None:
+        """
+        Record a state change; usable as a WLEDClient listener.
+
+        Writes made by a replay are skipped so that replaying a log does
+        not append the replayed events back into it. Non-literal writes are
+        logged verbatim as commands and make the device's state unknown
+        until its next poll.
+
+        Args:
+            client: Device the change was observed on
+            state: Full state ('poll') or patch ('write', 'replay')
+            source: 'poll', 'write' or 'replay'
+        """
+        if source == 'replay':
+            return
+        timestamp = time.time()
+        with self._lock:
+            device = self._devices.get(client.host)
+            if device is None:
+                device = len(self._devices)
+                self._devices[client.host] = device
+                self._write(timestamp, device, KIND_DEVICE,
+                            _encode(client.host))
+
+            if source == 'write' and not is_literal(state):
+                self._states.pop(device, None)
+                self._write(timestamp, device, KIND_COMMAND, _encode(state))
+                self._commit(timestamp)
+                return
+
+            previous = self._states.get(device, {})
+            if source == 'write':
+                current = merge_state(previous, state)
+            else:
+                current = state
+            delta = diff_state(previous, current)
+            if not delta:
+                return
+
+            self._states[device] = merge_state(previous, delta)
+            self._write(timestamp, device, KIND_DELTA, _encode(delta))
+            self._commit(timestamp)
+
+    def _commit(self, timestamp: float) -> None:
+        """Count a written change, checkpointing when due, and flush."""
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_interval:
+            self._checkpoint(timestamp)
+        self._log.flush()
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of a timeline replay."""
+
+    events: int
+    failures: int
+    duration_ms: float
+
+
+def replay(reader: TimelineReader, targets: Dict[str, List[WLEDClient]],
+           speed: float = 1.0, start: Optional[float] = None,
+           end: Optional[float] = None,
+           stop: Optional[threading.Event] = None) -> ReplayResult:
+    """
+    Replay a recorded timeline against devices.
+
+    Preset and playlist keys are never sent, and writes are reported to
+    listeners with source 'replay' so a recorder does not log them again.
+
+    Args:
+        reader: Timeline to replay
+        targets: Devices to send each recorded device's changes to, keyed
+            by the recorded device host
+        speed: Playback speed multiplier (1.0 is real time)
+        start: First timestamp to replay (default: beginning of log)
+        end: Last timestamp to replay (default: end of log)
+        stop: Event that aborts the replay when set, even mid-wait
+
+    Returns:
+        Number of events sent, failed sends and wall-clock duration
+
+    Raises:
+        ValueError: If speed is not positive
+    """
+    if speed <= 0:
+        raise ValueError(f'Replay speed must be positive: {speed}')
+
+    events = failures = 0
+    wall_start = time.perf_counter()
+    first_ts: Optional[float] = None
+    for event in reader.events(start, end):
+        if stop is not None and stop.is_set():
+            break
+        if first_ts is None:
+            first_ts = event.timestamp
+        delay = (event.timestamp - first_ts) / speed
+        remaining = wall_start + delay - time.perf_counter()
+        if remaining > 0:
+            if stop is None:
+                time.sleep(remaining)
+            elif stop.wait(remaining):
+                break
+
+        patch = replayable_state(event.patch)
+        if not patch:
+            continue
+        if stop is not None and stop.is_set():
+            break
+        for client in targets.get(event.device, []):
+            events += 1
+            if not client.set_state(patch, source='replay'):
+                failures += 1
+
+    duration = round((time.perf_counter() - wall_start) * 1000, 2)
+    return ReplayResult(events, failures, duration)
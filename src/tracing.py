@@ -0,0 +1,229 @@
+"""Opt-in per-request tracing and sampling profiling."""
+
+import contextlib
+import contextvars
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Callable, ContextManager, Coroutine, Dict, Optional
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Trace:
+    """Span durations collected while handling one request."""
+
+    __slots__ = ('spans',)
+
+    def __init__(self) -> None:
+        """Initialize an empty trace."""
+        self.spans: Dict[str, float] = {}
+
+    def add(self, name: str, duration: float) -> None:
+        """
+        Add time to a span, summing repeated spans of the same name.
+
+        Args:
+            name: Span name
+            duration: Duration in seconds
+        """
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def server_timing(self) -> str:
+        """Format the spans as a Server-Timing header value."""
+        return ', '.join(f'{name};dur={duration * 1000:.2f}'
+                         for name, duration in self.spans.items())
+
+
+class _Span:
+    """Context manager timing one span into a trace."""
+
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace: Trace, name: str) -> None:
+        """
+        Initialize the span.
+
+        Args:
+            trace: Trace to record into
+            name: Span name
+        """
+        self.trace = trace
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        """Start timing."""
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop timing and add the duration to the trace."""
+        self.trace.add(self.name, time.perf_counter() - self.start)
+
+
+class Tracer:
+    """Switchable tracer; spans are shared no-ops while disabled."""
+
+    def __init__(self, enabled: bool = False):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled: Whether requests are traced (default: False)
+        """
+        self.enabled = enabled
+        self._current: contextvars.ContextVar[Optional[Trace]] = (
+            contextvars.ContextVar('trace', default=None)
+        )
+
+    def span(self, name: str) -> ContextManager[None]:
+        """
+        Time a block of code into the current request's trace.
+
+        Args:
+            name: Span name (reported in the Server-Timing header)
+
+        Returns:
+            Context manager timing the block, or a no-op if not tracing
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        trace = self._current.get()
+        if trace is None:
+            return _NULL_SPAN
+        return _Span(trace, name)
+
+    def start(self) -> 'contextvars.Token[Optional[Trace]]':
+        """Start a new trace in the current context."""
+        return self._current.set(Trace())
+
+    def current(self) -> Optional[Trace]:
+        """Get the trace of the current context, if any."""
+        return self._current.get()
+
+    def finish(self, token: 'contextvars.Token[Optional[Trace]]') -> None:
+        """End the trace started with the given token."""
+        self._current.reset(token)
+
+
+tracer = Tracer()
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header to traced requests."""
+
+    def __init__(self, app: ASGIApp):
+        """
+        Wrap an ASGI application.
+
+        Args:
+            app: Application to wrap
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        """Handle a request, tracing it if tracing is enabled."""
+        if scope['type'] != 'http' or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        token = tracer.start()
+        trace = tracer.current()
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message['type'] == 'http.response.start' and trace is not None:
+                trace.add('app', time.perf_counter() - start)
+                headers = MutableHeaders(scope=message)
+                headers.append('Server-Timing', trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            tracer.finish(token)
+
+
+class TracedRoute(APIRoute):
+    """API route timing its whole handler as a 'handler' span."""
+
+    def get_route_handler(
+            self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        """Wrap the default route handler in a 'handler' span."""
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Request) -> Response:
+            with tracer.span('handler'):
+                return await handler(request)
+
+        return traced_handler
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling the stacks of all threads."""
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval: Seconds between samples (default: 0.005)
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """True while a profile is being collected."""
+        return self._lock.locked()
+
+    def run(self, duration: float) -> str:
+        """
+        Sample all other threads for a time window.
+
+        Args:
+            duration: Seconds to sample for
+
+        Returns:
+            Stacks in collapsed format (``frame;frame;frame count`` per
+            line), as read by flamegraph.pl and speedscope
+
+        Raises:
+            RuntimeError: If a profile is already running
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError('A profile is already running')
+        try:
+            stacks: Counter = Counter()
+            own_thread = threading.get_ident()
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_thread:
+                        stacks[self._collapse(frame)] += 1
+                time.sleep(self.interval)
+        finally:
+            self._lock.release()
+        return ''.join(f'{stack} {count}\n'
+                       for stack, count in stacks.most_common())
+
+    @staticmethod
+    def _collapse(frame: FrameType) -> str:
+        """Render a frame's stack root-first as a collapsed stack line."""
+        names = []
+        current: Optional[FrameType] = frame
+        while current is not None:
+            code = current.f_code
+            names.append(f'{code.co_name} ({code.co_filename}:'
+                         f'{code.co_firstlineno})')
+            current = current.f_back
+        return ';'.join(reversed(names))
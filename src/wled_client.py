@@ -2,10 +2,18 @@
 
 import json
 import logging
-from typing import Dict, List, Optional, Tuple, Any
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Any
 import requests
 from requests.exceptions import RequestException, Timeout, ConnectionError
 
+from .state_diff import is_literal, merge_state
+from .tracing import tracer
+
+# Weight of the newest sample in the round-trip time moving average
+RTT_SMOOTHING = 0.3
+
 
 class WLEDClient:
     """Client for interacting with WLED devices via JSON API."""
@@ -20,6 +28,10 @@ class WLEDClient:
         """
         self.host = host.rstrip('/')
         self.timeout = timeout
+        self.last_state: Optional[Dict] = None
+        self._state_lock = threading.Lock()
+        self.rtt: Optional[float] = None
+        self.listeners: List[Callable[['WLEDClient', Dict, str], None]] = []
         self.logger = logging.getLogger(__name__)
         
     def _make_request(self, method: str, endpoint: str, 
@@ -38,15 +50,21 @@ class WLEDClient:
         url = f'{self.host}{endpoint}'
         
         try:
-            if method.upper() == 'GET':
-                response = requests.get(url, timeout=self.timeout)
-            elif method.upper() == 'POST':
-                response = requests.post(url, json=data, timeout=self.timeout)
-            else:
-                raise ValueError(f'Unsupported HTTP method: {method}')
+            start = time.perf_counter()
+            # requests does not expose connect separately from send/wait
+            with tracer.span('wled-send'):
+                if method.upper() == 'GET':
+                    response = requests.get(url, timeout=self.timeout)
+                elif method.upper() == 'POST':
+                    response = requests.post(url, json=data,
+                                             timeout=self.timeout)
+                else:
+                    raise ValueError(f'Unsupported HTTP method: {method}')
+            self._record_rtt(time.perf_counter() - start)
                 
             response.raise_for_status()
-            return response.json()
+            with tracer.span('wled-parse'):
+                return response.json()
             
         except (RequestException, Timeout, ConnectionError) as e:
             self.logger.error(f'Request failed: {e}')
@@ -55,6 +73,54 @@ class WLEDClient:
             self.logger.error(f'Invalid JSON response: {e}')
             return None
             
+    def add_listener(
+            self, listener: Callable[['WLEDClient', Dict, str], None]) -> None:
+        """
+        Register a callback for observed state changes.
+
+        The callback receives the client, the state (full for 'poll',
+        a patch otherwise) and the source ('poll', 'write' or 'replay').
+
+        Args:
+            listener: Callback to invoke
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, state: Dict, source: str) -> None:
+        """Pass an observed state change to all listeners."""
+        for listener in self.listeners:
+            try:
+                listener(self, state, source)
+            except Exception as e:
+                self.logger.error(f'State listener failed: {e}')
+
+    def _record_rtt(self, sample: float) -> None:
+        """
+        Fold a round-trip time sample into the moving average.
+
+        Args:
+            sample: Measured round-trip time in seconds
+        """
+        if self.rtt is None:
+            self.rtt = sample
+        else:
+            self.rtt += RTT_SMOOTHING * (sample - self.rtt)
+
+    def measure_latency(self, samples: int = 3) -> Optional[float]:
+        """
+        Probe the device to refresh its round-trip time estimate.
+
+        Args:
+            samples: Number of state requests to send (default: 3)
+
+        Returns:
+            Smoothed round-trip time in seconds or None if unreachable
+        """
+        for _ in range(samples):
+            if self.get_state() is None:
+                return None
+        return self.rtt
+
     def get_state(self) -> Optional[Dict]:
         """
         Get current WLED state.
@@ -62,7 +128,42 @@ class WLEDClient:
         Returns:
             Current state dictionary or None if request failed
         """
-        return self._make_request('GET', '/json/state')
+        state = self._make_request('GET', '/json/state')
+        if state is not None:
+            with self._state_lock:
+                self.last_state = state
+            self._notify(state, 'poll')
+        return state
+
+    def set_state(self, data: Dict, source: str = 'write') -> bool:
+        """
+        Send a partial state update to WLED.
+
+        The cached last known state is patched locally on success so that
+        later diffs do not need to re-read the device. Toggles, relative
+        values and segment objects cannot be predicted locally, so they
+        clear the cached state instead. Cache updates are serialized so that
+        concurrent writers from worker threads do not lose each other's
+        changes.
+
+        Args:
+            data: State patch as accepted by /json/state
+            source: Source reported to listeners (default: write)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        response = self._make_request('POST', '/json/state', data)
+        if response is None:
+            return False
+        with self._state_lock:
+            if self.last_state is not None:
+                if is_literal(data):
+                    self.last_state = merge_state(self.last_state, data)
+                else:
+                    self.last_state = None
+        self._notify(data, source)
+        return True
         
     def get_effects(self) -> Optional[List[str]]:
         """
@@ -88,8 +189,7 @@ class WLEDClient:
             True if successful, False otherwise
         """
         data = {'on': True}
-        response = self._make_request('POST', '/json/state', data)
-        return response is not None
+        return self.set_state(data)
         
     def turn_off(self) -> bool:
         """
@@ -99,8 +199,7 @@ class WLEDClient:
             True if successful, False otherwise
         """
         data = {'on': False}
-        response = self._make_request('POST', '/json/state', data)
-        return response is not None
+        return self.set_state(data)
         
     def toggle(self) -> bool:
         """
@@ -115,8 +214,7 @@ class WLEDClient:
             
         new_state = not current_state.get('on', False)
         data = {'on': new_state}
-        response = self._make_request('POST', '/json/state', data)
-        return response is not None
+        return self.set_state(data)
         
     def set_brightness(self, brightness: int) -> bool:
         """
@@ -133,8 +231,7 @@ class WLEDClient:
             return False
             
         data = {'bri': brightness}
-        response = self._make_request('POST', '/json/state', data)
-        return response is not None
+        return self.set_state(data)
         
     def set_color(self, red: int, green: int, blue: int, 
                   white: int = 0) -> bool:
@@ -161,8 +258,7 @@ class WLEDClient:
                 'col': [[red, green, blue, white]]
             }]
         }
-        response = self._make_request('POST', '/json/state', data)
-        return response is not None
+        return self.set_state(data)
         
     def set_effect(self, effect_id: int) -> bool:
         """
@@ -183,8 +279,7 @@ class WLEDClient:
                 'fx': effect_id
             }]
         }
-        response = self._make_request('POST', '/json/state', data)
-        return response is not None
+        return self.set_state(data)
         
     def set_effect_speed(self, speed: int) -> bool:
         """
@@ -205,8 +300,7 @@ class WLEDClient:
                 'sx': speed
             }]
         }
-        response = self._make_request('POST', '/json/state', data)
-        return response is not None
+        return self.set_state(data)
         
     def set_effect_intensity(self, intensity: int) -> bool:
         """
@@ -227,8 +321,7 @@ class WLEDClient:
                 'ix': intensity
             }]
         }
-        response = self._make_request('POST', '/json/state', data)
-        return response is not None
+        return self.set_state(data)
         
     def is_connected(self) -> bool:
         """
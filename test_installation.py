@@ -37,6 +37,7 @@ def main():
         ('uvicorn', 'uvicorn'),
         ('jinja2', 'jinja2'),
         ('dotenv', 'python-dotenv'),
+        ('paho.mqtt.client', 'paho-mqtt'),
     ]
     
     all_installed = True
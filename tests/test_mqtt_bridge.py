@@ -0,0 +1,214 @@
+"""Unit tests for the MQTT bridge."""
+
+import asyncio
+import json
+
+from src.mqtt_bridge import LocalBroker, MQTTBridge, topic_matches
+from src.state_diff import is_literal, merge_state
+from src.wled_client import WLEDClient
+
+
+class RecordingClient(WLEDClient):
+    """WLED client stand-in recording state writes."""
+
+    def __init__(self, host, state=None):
+        """Set up the simulated device."""
+        super().__init__(host)
+        self.last_state = state
+        self.device_state = dict(state or {})
+        self.posts = []
+
+    def _make_request(self, method, endpoint, data=None):
+        """Record writes and apply the literal ones to the device state."""
+        if method == 'GET':
+            return dict(self.device_state)
+        self.posts.append(data)
+        if is_literal(data):
+            self.device_state = merge_state(self.device_state, data)
+        return {'success': True}
+
+
+async def drain(broker_client):
+    """Collect all messages currently queued for a broker client."""
+    messages = {}
+    while not broker_client._queue.empty():
+        topic, payload = broker_client._queue.get_nowait()
+        messages[topic] = json.loads(payload)
+    return messages
+
+
+class TestMQTTBridge:
+    """Test cases for MQTTBridge against the local broker stand-in."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.broker = LocalBroker()
+        self.devices = {
+            'one': RecordingClient('http://one.local',
+                                   {'on': False, 'bri': 10}),
+            'two': RecordingClient('http://two.local'),
+        }
+        self.bridge = MQTTBridge(self.broker.client(), self.devices,
+                                 groups={'all': ['one', 'two']},
+                                 window=0.02)
+
+    def run(self, messages, gap=0.0):
+        """Publish messages through the broker and let the bridge flush."""
+        async def scenario():
+            await self.bridge.start()
+            publisher = self.broker.client()
+            await publisher.connect()
+            for topic, payload in messages:
+                await publisher.publish(topic, payload)
+                await asyncio.sleep(gap)
+            await asyncio.sleep(0.1)
+            await self.bridge.stop()
+        asyncio.run(scenario())
+
+    def test_topic_matches(self):
+        """Test MQTT wildcard matching."""
+        assert topic_matches('wled/device/+/set', 'wled/device/one/set')
+        assert topic_matches('wled/#', 'wled/device/one/set')
+        assert not topic_matches('wled/device/+/set', 'wled/device/one')
+        assert not topic_matches('wled/device/+', 'wled/device/one/set')
+
+    def test_burst_is_merged_into_one_write(self):
+        """Test that a burst of messages becomes a single minimal patch."""
+        self.run([
+            ('wled/device/one/set', b'{"on": true}'),
+            ('wled/device/one/set', b'{"bri": 50}'),
+            ('wled/device/one/set', b'{"bri": 80}'),
+        ])
+
+        assert self.devices['one'].posts == [{'on': True, 'bri': 80}]
+        assert self.bridge.stats.messages == 3
+        assert self.bridge.stats.writes == 1
+        assert json.loads(self.broker.retained['wled/device/one/state']) == {
+            'on': True, 'bri': 80,
+        }
+
+    def test_group_fans_out(self):
+        """Test that group topics reach every member device."""
+        self.run([('wled/group/all/set', b'{"on": true}')])
+
+        assert self.devices['one'].posts == [{'on': True}]
+        assert self.devices['two'].posts == [{'on': True}]
+        assert set(self.broker.retained) == {'wled/device/one/state',
+                                             'wled/device/two/state'}
+
+    def test_no_op_commands_are_not_sent(self):
+        """Test that duplicates in a burst are sent once, cache or not."""
+        self.devices['one'].device_state['on'] = True
+        self.run([
+            ('wled/device/one/set', b'{"on": false}'),
+            ('wled/device/one/set', b'{"on": false}'),
+            ('wled/device/one/set', b'{"on": false, "bri": 10}'),
+        ])
+
+        assert self.devices['one'].posts == [{'on': False, 'bri': 10}]
+        assert self.devices['one'].device_state == {'on': False, 'bri': 10}
+        assert self.bridge.stats.writes == 1
+
+    def test_toggles_are_never_deduplicated(self):
+        """Test that repeated toggles each reach the device."""
+        self.run([
+            ('wled/device/one/set', b'{"on": "t"}'),
+            ('wled/device/one/set', b'{"on": "t"}'),
+        ], gap=0.1)
+
+        assert self.devices['one'].posts == [{'on': 't'}, {'on': 't'}]
+        assert json.loads(self.broker.retained['wled/device/one/state']) == {
+            'on': False, 'bri': 10,
+        }
+
+    def test_relative_steps_are_not_collapsed(self):
+        """Test that relative steps in one window are all sent."""
+        self.run([
+            ('wled/device/one/set', b'{"bri": "~10"}'),
+            ('wled/device/one/set', b'{"bri": "~10"}'),
+        ])
+
+        assert self.devices['one'].posts == [{'bri': '~10'}, {'bri': '~10'}]
+
+    def test_segment_object_is_passed_through(self):
+        """Test that a seg object still targets all selected segments."""
+        self.run([('wled/device/one/set', b'{"seg": {"fx": 5}}')])
+
+        assert self.devices['one'].posts == [{'seg': {'fx': 5}}]
+
+    def test_segment_delete_survives_merge(self):
+        """Test that a segment delete merged into a burst is still sent."""
+        self.run([
+            ('wled/device/one/set', b'{"seg": [{"id": 1, "fx": 3}]}'),
+            ('wled/device/one/set', b'{"seg": [{"id": 1, "stop": 0}]}'),
+        ])
+
+        assert self.devices['one'].posts == [
+            {'seg': [{'id': 1, 'fx': 3, 'stop': 0}]},
+        ]
+
+    def test_literal_writes_merge_around_relative_ones(self):
+        """Test that merging never reorders writes around a relative one."""
+        self.run([
+            ('wled/device/one/set', b'{"bri": 50}'),
+            ('wled/device/one/set', b'{"bri": "~10"}'),
+            ('wled/device/one/set', b'{"on": true}'),
+            ('wled/device/one/set', b'{"bri": 90}'),
+        ])
+
+        assert self.devices['one'].posts == [
+            {'bri': 50},
+            {'bri': '~10'},
+            {'on': True, 'bri': 90},
+        ]
+
+    def test_failed_write_discards_the_queue(self, caplog):
+        """Test that a failed write drops the rest of the queue loudly."""
+        self.devices['one']._make_request = lambda *args, **kwargs: None
+        self.run([
+            ('wled/device/one/set', b'{"on": "t"}'),
+            ('wled/device/one/set', b'{"bri": "~10"}'),
+            ('wled/device/one/set', b'{"bri": 90}'),
+        ])
+
+        assert self.bridge.stats.writes == 1
+        assert self.bridge.stats.failures == 1
+        assert 'wled/device/one/state' not in self.broker.retained
+        assert 'MQTT write to one failed; dropped 2 queued writes' in (
+            caplog.text)
+
+    def test_invalid_messages_are_counted(self):
+        """Test that unknown topics and bad payloads are ignored."""
+        self.run([
+            ('wled/device/missing/set', b'{"on": true}'),
+            ('wled/device/one/set', b'not json'),
+            ('wled/device/one/set', b'[1, 2]'),
+        ])
+
+        assert self.devices['one'].posts == []
+        assert self.bridge.stats.invalid == 3
+
+    def test_stats_report_throughput_and_latency(self):
+        """Test that throughput and end-to-end latency are reported."""
+        self.run([('wled/device/two/set', b'{"bri": %d}' % i)
+                  for i in range(20)])
+        report = self.bridge.stats.to_dict()
+
+        assert report['messages'] == 20
+        assert report['writes'] == 1
+        assert report['messages_per_sec'] > 0
+        assert report['latency_ms']['p95'] >= report['latency_ms']['p50'] > 0
+
+    def test_retained_state_reaches_late_subscribers(self):
+        """Test that state published by the bridge is retained."""
+        self.run([('wled/device/two/set', b'{"on": true}')])
+
+        async def subscribe_late():
+            subscriber = self.broker.client()
+            await subscriber.connect()
+            await subscriber.subscribe('wled/device/+/state')
+            return await drain(subscriber)
+
+        assert asyncio.run(subscribe_late()) == {
+            'wled/device/two/state': {'on': True},
+        }
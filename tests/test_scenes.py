@@ -0,0 +1,121 @@
+"""Unit tests for the scene store and bulk scene application."""
+
+import json
+
+import responses
+
+from src.scenes import SceneStore, apply_scene
+from src.wled_client import WLEDClient
+
+
+class TestSceneStore:
+    """Test cases for SceneStore."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.state = {'on': True, 'bri': 200, 'ps': 3,
+                      'seg': [{'id': 0, 'fx': 5}]}
+
+    def test_save_and_get(self, tmp_path):
+        """Test round-tripping a scene without replay-unsafe keys."""
+        store = SceneStore(str(tmp_path / 'scenes.db'))
+        store.save('party', self.state)
+
+        assert store.get('party') == {'on': True, 'bri': 200,
+                                      'seg': [{'id': 0, 'fx': 5}]}
+        assert store.get('missing') is None
+
+    def test_names_and_delete(self, tmp_path):
+        """Test listing and deleting scenes."""
+        store = SceneStore(str(tmp_path / 'scenes.db'))
+        store.save('b', self.state)
+        store.save('a', self.state)
+
+        assert store.names() == ['a', 'b']
+        assert store.delete('a') is True
+        assert store.delete('a') is False
+        assert store.names() == ['b']
+
+
+class TestApplyScene:
+    """Test cases for apply_scene."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.scene = {'on': True, 'bri': 200, 'seg': [{'id': 0, 'fx': 5}]}
+        self.clients = {
+            'one': WLEDClient('http://one.local'),
+            'two': WLEDClient('http://two.local'),
+        }
+
+    @responses.activate
+    def test_apply_sends_only_changes(self):
+        """Test that each device only receives its own diff."""
+        responses.add(responses.GET, 'http://one.local/json/state',
+                      json={'on': True, 'bri': 10,
+                            'seg': [{'id': 0, 'fx': 5}]})
+        responses.add(responses.GET, 'http://two.local/json/state',
+                      json={'on': False, 'bri': 200,
+                            'seg': [{'id': 0, 'fx': 1}]})
+        responses.add(responses.POST, 'http://one.local/json/state',
+                      json={'success': True})
+        responses.add(responses.POST, 'http://two.local/json/state',
+                      json={'success': True})
+
+        result = apply_scene('party', self.scene, self.clients)
+
+        assert result.success is True
+        sent = {call.request.url: json.loads(call.request.body)
+                for call in responses.calls
+                if call.request.method == 'POST'}
+        assert sent == {
+            'http://one.local/json/state': {'bri': 200},
+            'http://two.local/json/state': {'on': True,
+                                            'seg': [{'fx': 5, 'id': 0}]},
+        }
+        assert self.clients['two'].last_state == self.scene
+
+    @responses.activate
+    def test_apply_skips_devices_already_in_scene(self):
+        """Test that up-to-date devices are not written to."""
+        for client in self.clients.values():
+            responses.add(responses.GET, f'{client.host}/json/state',
+                          json=self.scene)
+
+        result = apply_scene('party', self.scene, self.clients)
+
+        assert result.success is True
+        assert all(call.request.method == 'GET' for call in responses.calls)
+        assert [device.changed for device in result.devices] == [{}, {}]
+
+    @responses.activate
+    def test_apply_ignores_stale_cache(self):
+        """Test that devices changed outside the app are diffed afresh."""
+        for client in self.clients.values():
+            client.last_state = dict(self.scene)
+            responses.add(responses.GET, f'{client.host}/json/state',
+                          json=dict(self.scene, on=False))
+            responses.add(responses.POST, f'{client.host}/json/state',
+                          json={'success': True})
+
+        result = apply_scene('party', self.scene, self.clients)
+
+        assert result.success is True
+        assert [device.changed for device in result.devices] == [
+            {'on': True}, {'on': True},
+        ]
+
+    @responses.activate
+    def test_apply_reports_unreachable_device(self):
+        """Test that unreachable devices are reported as failures."""
+        responses.add(responses.GET, 'http://one.local/json/state',
+                      json=self.scene)
+        responses.add(responses.GET, 'http://two.local/json/state',
+                      status=500)
+
+        result = apply_scene('party', self.scene, self.clients)
+        report = result.to_dict()
+
+        assert result.success is False
+        assert [d['success'] for d in report['devices']] == [True, False]
+        assert report['total_ms'] >= 0
@@ -0,0 +1,88 @@
+"""Unit tests for state diff helpers."""
+
+from src.state_diff import (
+    diff_state,
+    is_literal,
+    merge_patch,
+    merge_state,
+    replayable_state,
+)
+
+
+class TestStateDiff:
+    """Test cases for diff_state and merge_state."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.state = {
+            'on': True,
+            'bri': 128,
+            'nl': {'on': False, 'dur': 60},
+            'seg': [
+                {'id': 0, 'start': 0, 'stop': 30, 'col': [[255, 0, 0]],
+                 'fx': 0},
+                {'id': 1, 'start': 30, 'stop': 60, 'col': [[0, 0, 255]],
+                 'fx': 9},
+            ],
+        }
+
+    def test_diff_identical_is_empty(self):
+        """Test that identical states produce no patch."""
+        assert diff_state(self.state, self.state) == {}
+
+    def test_diff_top_level_and_nested(self):
+        """Test that only changed fields are included."""
+        target = merge_state(self.state, {'bri': 255, 'nl': {'dur': 30}})
+        assert diff_state(self.state, target) == {
+            'bri': 255,
+            'nl': {'dur': 30},
+        }
+
+    def test_diff_segments_by_id(self):
+        """Test that segment patches carry their id and changed fields."""
+        target = merge_state(self.state, {'seg': [{'id': 1, 'fx': 42}]})
+        assert diff_state(self.state, target) == {
+            'seg': [{'id': 1, 'fx': 42}],
+        }
+
+    def test_diff_removes_extra_segments(self):
+        """Test that segments missing from the target are deleted."""
+        target = dict(self.state, seg=self.state['seg'][:1])
+        assert diff_state(self.state, target) == {
+            'seg': [{'id': 1, 'stop': 0}],
+        }
+
+    def test_merge_does_not_modify_inputs(self):
+        """Test that merge_state returns a new state."""
+        merged = merge_state(self.state, {'seg': [{'col': [[1, 2, 3]]}]})
+        assert merged['seg'][0]['col'] == [[1, 2, 3]]
+        assert self.state['seg'][0]['col'] == [[255, 0, 0]]
+
+    def test_merge_deletes_stopped_segment(self):
+        """Test that stop=0 removes a segment."""
+        merged = merge_state(self.state, {'seg': [{'id': 1, 'stop': 0}]})
+        assert [seg['id'] for seg in merged['seg']] == [0]
+
+    def test_replayable_state_strips_presets(self):
+        """Test that preset and playlist keys are removed."""
+        state = dict(self.state, ps=3, pl=-1)
+        assert replayable_state(state) == self.state
+        assert 'ps' in state
+
+    def test_is_literal(self):
+        """Test detection of state-dependent commands."""
+        assert is_literal({'on': True, 'bri': 10, 'seg': [{'fx': 1}]})
+        assert not is_literal({'on': 't'})
+        assert not is_literal({'bri': '~-10'})
+        assert not is_literal({'seg': [{'id': 0, 'fx': '~'}]})
+        assert not is_literal({'seg': {'fx': 5}})
+        assert not is_literal({'nl': {'on': 't'}})
+
+    def test_merge_patch_keeps_segment_deletes(self):
+        """Test that merged patches keep stop=0 and explicit ids."""
+        merged = merge_patch({'seg': [{'fx': 3}, {'id': 1, 'fx': 3}]},
+                             {'seg': [{'id': 1, 'stop': 0}], 'bri': 5})
+        assert merged == {
+            'seg': [{'id': 0, 'fx': 3}, {'id': 1, 'fx': 3, 'stop': 0}],
+            'bri': 5,
+        }
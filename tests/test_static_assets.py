@@ -0,0 +1,123 @@
+"""Unit tests for static asset delivery."""
+
+import gzip
+
+from starlette.requests import Request
+
+from src.static_assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    Asset,
+    StaticAssetCache,
+    etag_matches,
+    select_encoding,
+)
+
+
+def make_request(**headers):
+    """Build a bare request carrying the given headers."""
+    raw = [(name.replace('_', '-').encode(), value.encode())
+           for name, value in headers.items()]
+    return Request({'type': 'http', 'method': 'GET', 'headers': raw})
+
+
+class TestStaticAssets:
+    """Test cases for precompressed static assets."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.body = b'console.log("hello");\n' * 50
+
+    def test_asset_precompresses_text(self):
+        """Test that compressible assets get a gzip variant."""
+        asset = Asset.from_bytes('app.js', self.body)
+        assert gzip.decompress(asset.variants['gzip']) == self.body
+        assert asset.media_type in ('application/javascript',
+                                    'text/javascript')
+
+    def test_asset_skips_small_files(self):
+        """Test that tiny assets are only stored uncompressed."""
+        asset = Asset.from_bytes('tiny.js', b'1;')
+        assert list(asset.variants) == ['identity']
+
+    def test_hashed_path_changes_with_content(self):
+        """Test that the hashed path follows the content."""
+        first = Asset.from_bytes('app.js', self.body)
+        second = Asset.from_bytes('app.js', self.body + b'x')
+        assert first.hashed_path.startswith('app.')
+        assert first.hashed_path.endswith('.js')
+        assert first.hashed_path != second.hashed_path
+
+    def test_select_encoding(self):
+        """Test Accept-Encoding negotiation."""
+        available = ['identity', 'gzip', 'br']
+        assert select_encoding('gzip, deflate, br', available) == 'br'
+        assert select_encoding('gzip', available) == 'gzip'
+        assert select_encoding('br;q=0, gzip', available) == 'gzip'
+        assert select_encoding('br;q=0, *', available) == 'gzip'
+        assert select_encoding('br;q=0, gzip;q=0, *', available) == 'identity'
+        assert select_encoding('*', available) == 'br'
+        assert select_encoding('', available) == 'identity'
+        assert select_encoding('br', ['identity', 'gzip']) == 'identity'
+
+    def test_select_encoding_ranks_q_values(self):
+        """Test that q-values are parsed case-insensitively and ranked."""
+        available = ['identity', 'gzip', 'br']
+        assert select_encoding('GZIP;Q=0', available) == 'identity'
+        assert select_encoding('br;q=0.1, gzip;q=1', available) == 'gzip'
+        assert select_encoding('br; q=0.5, gzip; q=0.4', available) == 'br'
+        assert select_encoding('br;q=0.000, *;q=0.2', available) == 'gzip'
+        assert select_encoding('gzip;q=bogus', available) == 'identity'
+
+    def test_etag_matches(self):
+        """Test If-None-Match comparison."""
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('W/"abc", "def"', '"abc"')
+        assert etag_matches('*', '"abc"')
+        assert not etag_matches('"def"', '"abc"')
+        assert not etag_matches('', '"abc"')
+
+    def test_cache_serves_hashed_path_immutable(self, tmp_path):
+        """Test that hashed URLs are served with immutable caching."""
+        (tmp_path / 'app.js').write_bytes(self.body)
+        cache = StaticAssetCache(str(tmp_path))
+        cache.load()
+
+        url = cache.url_for('app.js')
+        response = cache.response(url[len('/static/'):],
+                                  make_request(accept_encoding='gzip'))
+        assert response.status_code == 200
+        assert response.headers['cache-control'] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers['content-encoding'] == 'gzip'
+        assert gzip.decompress(response.body) == self.body
+
+    def test_cache_serves_plain_path_with_revalidation(self, tmp_path):
+        """Test that plain URLs must be revalidated."""
+        (tmp_path / 'app.js').write_bytes(self.body)
+        cache = StaticAssetCache(str(tmp_path))
+        cache.load()
+
+        response = cache.response('app.js', make_request())
+        assert response.status_code == 200
+        assert response.headers['cache-control'] == REVALIDATE_CACHE_CONTROL
+        assert 'content-encoding' not in response.headers
+        assert response.body == self.body
+
+    def test_cache_not_modified(self, tmp_path):
+        """Test that a matching ETag yields 304 without a body."""
+        (tmp_path / 'app.js').write_bytes(self.body)
+        cache = StaticAssetCache(str(tmp_path))
+        cache.load()
+
+        etag = cache.response('app.js', make_request()).headers['etag']
+        response = cache.response('app.js', make_request(if_none_match=etag))
+        assert response.status_code == 304
+        assert response.body == b''
+
+    def test_cache_unknown_asset(self, tmp_path):
+        """Test lookups of missing assets."""
+        cache = StaticAssetCache(str(tmp_path))
+        cache.load()
+
+        assert cache.response('missing.js', make_request()) is None
+        assert cache.url_for('missing.js') == '/static/missing.js'
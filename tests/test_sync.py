@@ -0,0 +1,94 @@
+"""Unit tests for synchronized multi-device apply."""
+
+import time
+
+import responses
+
+from src.sync import synchronized_apply
+from src.wled_client import WLEDClient
+
+
+class DelayedClient(WLEDClient):
+    """WLED client stand-in with a fixed round-trip time."""
+
+    def __init__(self, host, delay, reachable=True):
+        """Set up the simulated device."""
+        super().__init__(host)
+        self.delay = delay
+        self.reachable = reachable
+        self.sent_at = None
+
+    def _make_request(self, method, endpoint, data=None):
+        """Simulate a request taking the configured round-trip time."""
+        if not self.reachable:
+            return None
+        if method == 'POST':
+            self.sent_at = time.perf_counter()
+        time.sleep(self.delay)
+        self._record_rtt(self.delay)
+        return {'success': True}
+
+
+class TestWLEDClientLatency:
+    """Test cases for round-trip time tracking."""
+
+    @responses.activate
+    def test_measure_latency(self):
+        """Test that probing records a round-trip time."""
+        client = WLEDClient('http://test.local')
+        responses.add(responses.GET, 'http://test.local/json/state',
+                      json={'on': True})
+
+        assert client.rtt is None
+        rtt = client.measure_latency(samples=2)
+        assert rtt is not None and rtt >= 0
+        assert len(responses.calls) == 2
+
+    def test_record_rtt_smoothing(self):
+        """Test that RTT samples are smoothed."""
+        client = WLEDClient('http://test.local')
+        client._record_rtt(0.1)
+        client._record_rtt(0.2)
+        assert 0.1 < client.rtt < 0.2
+
+
+class TestSynchronizedApply:
+    """Test cases for synchronized_apply."""
+
+    def test_slow_devices_are_sent_first(self):
+        """Test that sends are staggered by one-way latency."""
+        clients = {
+            'slow': DelayedClient('http://slow.local', 0.06),
+            'fast': DelayedClient('http://fast.local', 0.01),
+        }
+
+        result = synchronized_apply(clients, lambda c: c.set_effect(5),
+                                    target_skew_ms=50)
+        by_name = {r.device: r for r in result.devices}
+
+        assert result.success is True
+        assert by_name['slow'].send_offset_ms == 0
+        assert 20 <= by_name['fast'].send_offset_ms <= 30
+        assert clients['slow'].sent_at < clients['fast'].sent_at
+        assert result.skew_ms < 50
+        assert result.within_target is True
+
+    def test_unreachable_device_is_reported(self):
+        """Test that unreachable devices fail without blocking others."""
+        clients = {
+            'up': DelayedClient('http://up.local', 0.001),
+            'down': DelayedClient('http://down.local', 0.001,
+                                  reachable=False),
+        }
+
+        result = synchronized_apply(clients, lambda c: c.set_effect(5))
+        report = result.to_dict()
+
+        assert result.success is False
+        assert [d['success'] for d in report['devices']] == [True, False]
+
+    def test_no_devices(self):
+        """Test that an empty device set is a no-op."""
+        result = synchronized_apply({}, lambda c: c.set_effect(5))
+        assert result.success is True
+        assert result.skew_ms == 0.0
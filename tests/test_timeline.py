@@ -0,0 +1,229 @@
+"""Unit tests for the state timeline recorder and replay."""
+
+import os
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+import responses
+
+from src.timeline import TimelineReader, TimelineRecorder, replay
+from src.wled_client import WLEDClient
+
+
+class TestTimeline:
+    """Test cases for timeline recording, seeking and replay."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.one = WLEDClient('http://one.local')
+        self.two = WLEDClient('http://two.local')
+
+    def record(self, path, changes, checkpoint_interval=256):
+        """Record (timestamp, client, state, source) changes into a log."""
+        recorder = TimelineRecorder(path, checkpoint_interval)
+        try:
+            for timestamp, client, state, source in changes:
+                with patch('src.timeline.time.time', return_value=timestamp):
+                    recorder.record(client, state, source)
+        finally:
+            recorder.close()
+
+    def test_records_only_deltas(self, tmp_path):
+        """Test that unchanged polls are dropped and writes are diffed."""
+        path = str(tmp_path / 'timeline.log')
+        self.record(path, [
+            (1.0, self.one, {'on': True, 'bri': 10}, 'poll'),
+            (2.0, self.one, {'on': True, 'bri': 10}, 'poll'),
+            (3.0, self.one, {'bri': 20}, 'write'),
+        ])
+
+        reader = TimelineReader(path)
+        events = [(e.timestamp, e.device, e.patch) for e in reader.events()]
+        reader.close()
+
+        assert events == [
+            (1.0, 'http://one.local', {'on': True, 'bri': 10}),
+            (3.0, 'http://one.local', {'bri': 20}),
+        ]
+
+    def test_non_literal_writes_are_logged_verbatim(self, tmp_path):
+        """Test that toggles are all logged and never become state."""
+        path = str(tmp_path / 'timeline.log')
+        self.record(path, [
+            (1.0, self.one, {'on': True, 'bri': 10}, 'poll'),
+            (2.0, self.one, {'on': 't'}, 'write'),
+            (3.0, self.one, {'on': 't', 'bri': '~10'}, 'write'),
+            (4.0, self.one, {'on': True, 'bri': 20}, 'poll'),
+        ])
+
+        reader = TimelineReader(path)
+        events = [(e.timestamp, e.patch) for e in reader.events()]
+        unknown = reader.seek(3.5)[1]
+        known = reader.seek(4.5)[1]
+        reader.close()
+
+        assert events == [
+            (1.0, {'on': True, 'bri': 10}),
+            (2.0, {'on': 't'}),
+            (3.0, {'on': 't', 'bri': '~10'}),
+            (4.0, {'on': True, 'bri': 20}),
+        ]
+        assert unknown == {}
+        assert known == {0: {'on': True, 'bri': 20}}
+
+    def test_seek_uses_checkpoints(self, tmp_path):
+        """Test that seeking reconstructs state from the nearest checkpoint."""
+        path = str(tmp_path / 'timeline.log')
+        changes = [(float(i), self.one if i % 2 else self.two,
+                    {'bri': i}, 'write') for i in range(1, 21)]
+        self.record(path, changes, checkpoint_interval=4)
+
+        reader = TimelineReader(path)
+        devices, states, _ = reader.seek(10.5)
+        assert reader.checkpoints == 5
+        assert reader.span() == (1.0, 20.0)
+        reader.close()
+
+        by_name = {devices[i]: state for i, state in states.items()}
+        assert by_name == {'http://one.local': {'bri': 9},
+                           'http://two.local': {'bri': 10}}
+
+    def test_index_rebuilt_when_missing(self, tmp_path):
+        """Test that a missing index is rebuilt by scanning the log."""
+        path = str(tmp_path / 'timeline.log')
+        changes = [(float(i), self.one, {'bri': i}, 'write')
+                   for i in range(1, 9)]
+        self.record(path, changes, checkpoint_interval=4)
+        os.remove(f'{path}.idx')
+
+        reader = TimelineReader(path)
+        assert reader.checkpoints == 2
+        assert reader.seek(5.0)[1] == {0: {'bri': 5}}
+        reader.close()
+
+    def test_recorder_resumes_existing_log(self, tmp_path):
+        """Test that reopening a log continues its device table and state."""
+        path = str(tmp_path / 'timeline.log')
+        self.record(path, [(1.0, self.one, {'on': True}, 'poll')])
+        self.record(path, [(2.0, self.one, {'on': True}, 'poll'),
+                           (3.0, self.two, {'on': False}, 'poll')])
+
+        reader = TimelineReader(path)
+        events = [(e.device, e.patch) for e in reader.events()]
+        reader.close()
+
+        assert events == [('http://one.local', {'on': True}),
+                          ('http://two.local', {'on': False})]
+
+    def test_not_a_timeline(self, tmp_path):
+        """Test that foreign files are rejected."""
+        path = tmp_path / 'other.log'
+        path.write_bytes(b'hello world')
+        with pytest.raises(ValueError):
+            TimelineReader(str(path))
+
+    def test_replay_from_midpoint(self, tmp_path):
+        """Test accelerated replay starting mid-log to many devices."""
+        path = str(tmp_path / 'timeline.log')
+        self.record(path, [
+            (1.0, self.one, {'on': True, 'bri': 10}, 'poll'),
+            (2.0, self.one, {'bri': 20}, 'write'),
+            (3.0, self.one, {'bri': 30}, 'write'),
+        ])
+        first, second = Mock(), Mock()
+        first.set_state.return_value = True
+        second.set_state.return_value = False
+
+        reader = TimelineReader(path)
+        result = replay(reader, {'http://one.local': [first, second]},
+                        speed=100.0, start=2.5)
+        reader.close()
+
+        assert [c.args[0] for c in first.set_state.call_args_list] == [
+            {'on': True, 'bri': 20},
+            {'bri': 30},
+        ]
+        assert result.events == 4
+        assert result.failures == 2
+
+    def test_replay_snapshot_skips_presets(self, tmp_path):
+        """Test that mid-log snapshots do not load presets or playlists."""
+        path = str(tmp_path / 'timeline.log')
+        self.record(path, [
+            (1.0, self.one, {'on': True, 'bri': 10, 'ps': 3, 'pl': -1},
+             'poll'),
+            (2.0, self.one, {'ps': 4}, 'write'),
+            (3.0, self.one, {'bri': 30}, 'write'),
+        ])
+        target = Mock()
+        target.set_state.return_value = True
+
+        reader = TimelineReader(path)
+        snapshot = next(reader.events(start=1.5))
+        result = replay(reader, {'http://one.local': [target]},
+                        speed=100.0, start=1.5)
+        reader.close()
+
+        assert snapshot.patch == {'on': True, 'bri': 10}
+        assert [c.args[0] for c in target.set_state.call_args_list] == [
+            {'on': True, 'bri': 10},
+            {'bri': 30},
+        ]
+        assert result.events == 2
+
+    @responses.activate
+    def test_replay_is_not_recorded_again(self, tmp_path):
+        """Test that replayed writes are not appended to the log."""
+        path = str(tmp_path / 'timeline.log')
+        self.record(path, [
+            (1.0, self.one, {'on': True}, 'poll'),
+            (2.0, self.one, {'bri': 20}, 'write'),
+        ])
+        size = os.path.getsize(path)
+        responses.add(responses.POST, 'http://one.local/json/state',
+                      json={'success': True})
+
+        recorder = TimelineRecorder(path)
+        self.one.add_listener(recorder.record)
+        reader = TimelineReader(path)
+        try:
+            result = replay(reader, {'http://one.local': [self.one]},
+                            speed=100.0)
+        finally:
+            reader.close()
+            recorder.close()
+
+        assert result.events == 2
+        assert result.failures == 0
+        assert os.path.getsize(path) == size
+
+    def test_replay_stops_during_a_gap(self, tmp_path):
+        """Test that setting stop interrupts the wait for the next event."""
+        path = str(tmp_path / 'timeline.log')
+        self.record(path, [
+            (1.0, self.one, {'bri': 1}, 'write'),
+            (3.0, self.one, {'bri': 2}, 'write'),
+        ])
+        target = Mock()
+        target.set_state.return_value = True
+        stop = threading.Event()
+        threading.Timer(0.1, stop.set).start()
+
+        reader = TimelineReader(path)
+        result = replay(reader, {'http://one.local': [target]}, stop=stop)
+        reader.close()
+
+        assert [c.args[0] for c in target.set_state.call_args_list] == [
+            {'bri': 1},
+        ]
+        assert result.duration_ms < 1000
+
+    def test_replay_rejects_bad_speed(self, tmp_path):
+        """Test that non-positive speeds are rejected."""
+        path = str(tmp_path / 'timeline.log')
+        self.record(path, [])
+        reader = TimelineReader(path)
+        with pytest.raises(ValueError):
+            replay(reader, {}, speed=0)
+        reader.close()
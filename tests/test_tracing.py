@@ -0,0 +1,145 @@
+"""Unit tests for request tracing and sampling profiling."""
+
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.tracing import (
+    SamplingProfiler,
+    ServerTimingMiddleware,
+    Trace,
+    TracedRoute,
+    Tracer,
+    tracer,
+)
+
+
+async def traced_endpoint(request):
+    """Endpoint recording a span."""
+    with tracer.span('work'):
+        time.sleep(0.001)
+    return PlainTextResponse('ok')
+
+
+def busy_wait_marker(stop):
+    """Spin until told to stop so the profiler has something to see."""
+    while not stop.is_set():
+        pass
+
+
+class TestTracing:
+    """Test cases for Tracer and ServerTimingMiddleware."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        app = Starlette(routes=[Route('/', traced_endpoint)])
+        app.add_middleware(ServerTimingMiddleware)
+        self.client = TestClient(app)
+
+    def teardown_method(self):
+        """Restore the global tracer."""
+        tracer.enabled = False
+
+    def test_trace_server_timing_format(self):
+        """Test Server-Timing formatting and span accumulation."""
+        trace = Trace()
+        trace.add('wled-send', 0.001)
+        trace.add('wled-send', 0.002)
+        trace.add('wled-parse', 0.0005)
+        assert trace.server_timing() == 'wled-send;dur=3.00, wled-parse;dur=0.50'
+
+    def test_span_is_noop_when_disabled(self):
+        """Test that disabled tracing hands out a shared no-op span."""
+        local = Tracer()
+        assert local.span('a') is local.span('b')
+
+    def test_span_is_noop_outside_request(self):
+        """Test that spans without an active trace are not recorded."""
+        local = Tracer(enabled=True)
+        with local.span('orphan'):
+            pass
+        assert local.current() is None
+
+    def test_span_records_into_current_trace(self):
+        """Test that spans add their duration to the active trace."""
+        local = Tracer(enabled=True)
+        token = local.start()
+        with local.span('work'):
+            pass
+        assert 'work' in local.current().spans
+        local.finish(token)
+        assert local.current() is None
+
+    def test_middleware_adds_header_when_enabled(self):
+        """Test that traced responses carry a Server-Timing header."""
+        tracer.enabled = True
+        response = self.client.get('/')
+        timing = response.headers['server-timing']
+        assert timing.startswith('work;dur=')
+        assert 'app;dur=' in timing
+
+    def test_traced_route_reports_handler_span(self):
+        """Test that API routes report their handler time."""
+        api = FastAPI()
+        api.router.route_class = TracedRoute
+        api.add_middleware(ServerTimingMiddleware)
+
+        @api.get('/api/ping')
+        async def ping():
+            with tracer.span('work'):
+                return {'ok': True}
+
+        tracer.enabled = True
+        timing = TestClient(api).get('/api/ping').headers['server-timing']
+        names = [part.split(';')[0] for part in timing.split(', ')]
+        assert names == ['work', 'handler', 'app']
+
+    def test_middleware_passthrough_when_disabled(self):
+        """Test that untraced responses are left untouched."""
+        response = self.client.get('/')
+        assert response.text == 'ok'
+        assert 'server-timing' not in response.headers
+
+
+class TestSamplingProfiler:
+    """Test cases for SamplingProfiler."""
+
+    def test_profile_collapsed_stacks(self):
+        """Test that samples of other threads are returned collapsed."""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_wait_marker, args=(stop,))
+        worker.start()
+        try:
+            output = SamplingProfiler(interval=0.001).run(0.05)
+        finally:
+            stop.set()
+            worker.join()
+
+        lines = [line for line in output.splitlines()
+                 if 'busy_wait_marker' in line]
+        assert lines
+        stack, count = lines[0].rsplit(' ', 1)
+        assert int(count) > 0
+        assert any(frame.startswith('busy_wait_marker')
+                   for frame in stack.split(';'))
+
+    def test_profile_rejects_concurrent_runs(self):
+        """Test that only one profile runs at a time."""
+        profiler = SamplingProfiler()
+        result = []
+        worker = threading.Thread(target=lambda: result.append(
+            profiler.run(0.1)))
+        worker.start()
+        time.sleep(0.02)
+        try:
+            with pytest.raises(RuntimeError):
+                profiler.run(0.01)
+        finally:
+            worker.join()
+        assert result
@@ -1,5 +1,7 @@
 """Unit tests for WLED client."""
 
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 import responses
 from unittest.mock import patch, Mock
@@ -212,6 +214,92 @@ class TestWLEDClient:
         result = self.client.set_effect_intensity(300)
         assert result is False
         
+    @responses.activate
+    def test_set_state_updates_cached_state(self):
+        """Test that a successful write patches the cached state."""
+        self.client.last_state = {'on': False, 'bri': 10}
+        responses.add(
+            responses.POST,
+            'http://test.local/json/state',
+            json={'success': True},
+            status=200
+        )
+
+        result = self.client.set_state({'on': True})
+        assert result is True
+        assert self.client.last_state == {'on': True, 'bri': 10}
+
+    @responses.activate
+    def test_set_state_relative_clears_cached_state(self):
+        """Test that toggles and relative values invalidate the cache."""
+        responses.add(
+            responses.POST,
+            'http://test.local/json/state',
+            json={'success': True},
+            status=200
+        )
+
+        for patch in ({'on': 't'}, {'bri': '~10'}, {'seg': {'fx': 1}}):
+            self.client.last_state = {'on': False, 'bri': 10}
+            assert self.client.set_state(patch) is True
+            assert self.client.last_state is None
+
+    @responses.activate
+    def test_concurrent_writes_keep_every_cached_change(self):
+        """Test that cache updates from parallel writers are not lost."""
+        self.client.last_state = {}
+        responses.add(
+            responses.POST,
+            'http://test.local/json/state',
+            json={'success': True},
+            status=200
+        )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(
+                lambda i: self.client.set_state({f'key{i}': i}), range(50)))
+
+        assert self.client.last_state == {f'key{i}': i for i in range(50)}
+
+    @responses.activate
+    def test_set_state_failure_keeps_cached_state(self):
+        """Test that a failed write leaves the cached state alone."""
+        self.client.last_state = {'on': False}
+        responses.add(
+            responses.POST,
+            'http://test.local/json/state',
+            status=500
+        )
+
+        result = self.client.set_state({'on': True})
+        assert result is False
+        assert self.client.last_state == {'on': False}
+
+    @responses.activate
+    def test_listeners_see_polls_and_writes(self):
+        """Test that state listeners are notified of observed changes."""
+        listener = Mock()
+        self.client.add_listener(listener)
+        responses.add(
+            responses.GET,
+            'http://test.local/json/state',
+            json={'on': True},
+            status=200
+        )
+        responses.add(
+            responses.POST,
+            'http://test.local/json/state',
+            json={'success': True},
+            status=200
+        )
+
+        self.client.get_state()
+        self.client.set_state({'bri': 5})
+        assert [c.args[1:] for c in listener.call_args_list] == [
+            ({'on': True}, 'poll'),
+            ({'bri': 5}, 'write'),
+        ]
+
     @responses.activate
     def test_is_connected_true(self):
         """Test connection check when device is reachable."""